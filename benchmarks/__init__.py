@@ -0,0 +1 @@
+"""Benchmarks that exercise the app outside of the test suite."""
@@ -0,0 +1,86 @@
+"""Benchmark of the CPU spent compressing responses against the bytes it saves.
+
+The listing pages and feeds are fetched uncompressed from a seeded database, then
+compressed with every encoder and level, both in one go and in the chunks a streamed
+response would flush:
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --blogs 100000 --levels 1 6 9
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from smoothblog import compression
+from .routes import ADMIN_EMAIL, ADMIN_PASSWORD, _login, make_app, seeded_database
+
+PAGES = ["/home", "/feed.atom", "/feed.rss", "/auth/admin"]
+
+
+def bodies(blogs):
+    """Return the uncompressed body of every page against `blogs` blogs."""
+    app = make_app(
+        seeded_database(blogs),
+        COMPRESSION_ENABLED=False,
+        LOGIN_THROTTLE_ENABLED=False,
+        RESPONSE_CACHE_ENABLED=False,
+    )
+    admin = app.test_client()
+    _login(admin, ADMIN_EMAIL, ADMIN_PASSWORD)
+    return {page: admin.get(page).get_data() for page in PAGES}
+
+
+def encoders(levels):
+    """Yield `(label, factory)` for every encoder and level to measure."""
+    for level in levels:
+        yield f"gzip-{level}", lambda level=level: compression.GzipEncoder(level)
+    if compression.brotli is not None:
+        for quality in (1, 4, 6, 11):
+            yield f"br-{quality}", lambda quality=quality: compression.BrotliEncoder(
+                quality
+            )
+
+
+def measure(factory, body, chunk_size, repeat):
+    """Return the compressed size and the median milliseconds to compress `body`."""
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compressed = b"".join(
+            compression.compress_stream(factory(), chunks, chunk_size)
+        )
+        timings.append(time.perf_counter() - start)
+    return len(compressed), statistics.median(timings) * 1000
+
+
+def main():
+    """Parse arguments and print the cost and savings of every encoder."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--blogs", type=int, default=1000)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9])
+    parser.add_argument("--chunk-size", type=int, default=8192)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if compression.brotli is None:
+        print("brotli is not installed, measuring gzip only.", file=sys.stderr)
+
+    for page, body in bodies(args.blogs).items():
+        print(f"{page} ({len(body)} bytes)")
+        for label, factory in encoders(args.levels):
+            for mode, chunk_size in (("whole", len(body)), ("stream", args.chunk_size)):
+                size, ms = measure(factory, body, chunk_size, args.repeat)
+                saved = len(body) - size
+                print(
+                    f"  {label:<8} {mode:<6} {size:>9} bytes  {size / len(body):6.1%}  "
+                    f"{ms:7.2f}ms  {saved / 1024 / max(ms, 1e-6):8.1f} KB saved/ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
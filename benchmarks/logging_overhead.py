@@ -0,0 +1,88 @@
+"""Measure what logging costs the calling (request) thread.
+
+Logs the same records through a plain `FileHandler`, as the app used to, and through
+the queued pipeline from `smoothblog.logs`:
+
+    python -m benchmarks.logging_overhead --records 100000
+    python -m benchmarks.logging_overhead --records 2000 --slow-write-ms 1
+
+`--slow-write-ms` makes every write sleep, to show what a slow or busy disk does to
+each approach.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from smoothblog.logs import queue_handlers, stop_listeners
+
+
+class SlowFileHandler(logging.FileHandler):
+    """File handler whose writes take at least `delay` seconds."""
+
+    def __init__(self, filename, delay):
+        super().__init__(filename)
+        self.delay = delay
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        super().emit(record)
+
+
+def run(name, records, delay, queued, queue_size):
+    """Log `records` records and return the per call latencies in microseconds."""
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = logging.getLogger(f"benchmark.{name}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = SlowFileHandler(os.path.join(tmp, "bench.log"), delay)
+        handler.setFormatter(
+            logging.Formatter("[%(asctime)s] %(levelname)s in %(module)s: %(message)s")
+        )
+        logger.addHandler(handler)
+        if queued:
+            queue_handlers(logger, queue_size)
+
+        latencies = []
+        for i in range(records):
+            start = time.perf_counter()
+            logger.info("GET /home %s 200 in %.1fms", i, 1.5)
+            latencies.append((time.perf_counter() - start) * 1_000_000)
+
+        dropped = getattr(logger.handlers[0], "dropped", 0)
+        stop_listeners()
+        handler.close()
+        logger.handlers.clear()
+
+    return latencies, dropped
+
+
+def main():
+    """Parse arguments and print the comparison."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--slow-write-ms", type=float, default=0)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(
+        f"{'handler':<8} {'mean us':>10} {'p99 us':>10} {'max us':>10} {'dropped':>8}"
+    )
+    for name, queued in (("file", False), ("queued", True)):
+        latencies, dropped = run(
+            name, args.records, args.slow_write_ms / 1000, queued, args.queue_size
+        )
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        print(
+            f"{name:<8} {statistics.fmean(latencies):>10.2f} {p99:>10.2f} "
+            f"{max(latencies):>10.2f} {dropped:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
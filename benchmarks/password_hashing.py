@@ -0,0 +1,83 @@
+"""Benchmark of logins per second for each password hashing policy.
+
+A login costs one `check_password_hash`, so this measures verifications per second,
+first on a single core on the calling thread and then through a `HashingPool` with one
+worker per core:
+
+    python -m benchmarks.password_hashing
+    python -m benchmarks.password_hashing --methods scrypt:16384:8:1 pbkdf2:sha256:600000
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+from smoothblog.passwords import DEFAULT_METHOD, HashingPool
+
+METHODS = [
+    DEFAULT_METHOD,
+    "scrypt:16384:8:1",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:260000",
+]
+
+
+def inline(pwhash, logins):
+    """Return logins per second when verifying on the calling thread."""
+    start = time.perf_counter()
+    for _ in range(logins):
+        check_password_hash(pwhash, "password")
+    return logins / (time.perf_counter() - start)
+
+
+def pooled(pwhash, logins, workers):
+    """Return logins per second when `workers` processes verify concurrently."""
+    pool = HashingPool(workers, workers, None)
+    try:
+        # Start every worker process before timing.
+        with ThreadPoolExecutor(workers) as threads:
+            list(threads.map(lambda _: pool.run(pow, 2, 2), range(workers)))
+
+            start = time.perf_counter()
+            list(
+                threads.map(
+                    lambda _: pool.run(check_password_hash, pwhash, "password"),
+                    range(logins),
+                )
+            )
+            return logins / (time.perf_counter() - start)
+    finally:
+        pool.executor.shutdown()
+
+
+def main():
+    """Parse arguments and print the logins per second of every method."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--methods", nargs="+", default=METHODS)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(
+        f"{'method':<24} {'logins/s (1 core)':>18} "
+        f"{f'logins/s ({args.workers} workers)':>24} {'per core':>10}",
+        file=sys.stderr,
+    )
+    for method in args.methods:
+        pwhash = generate_password_hash("password", method)
+        single = inline(pwhash, args.logins)
+        parallel = pooled(pwhash, args.logins * args.workers, args.workers)
+        print(
+            f"{method:<24} {single:>18.1f} {parallel:>24.1f} "
+            f"{parallel / args.workers:>10.1f}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""End-to-end benchmark of the main routes against seeded databases.
+
+Every route is driven through `app.test_client()`, so the numbers cover routing,
+queries and template rendering but not a real web server. For each database size it
+records latency percentiles, throughput and SQL statements per request:
+
+    python -m benchmarks.routes --sizes 1000 100000 --output results.json
+    python -m benchmarks.routes --sizes 1000 100000 --baseline results.json
+
+Seeded databases are kept in `benchmarks/.data` and reused between runs, upgraded to the
+current schema first. With `--baseline`, the run fails when a route got slower than
+the tolerance allows or started issuing more statements.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import event
+from smoothblog import create_app, migrations
+from smoothblog.cli import init_db
+from smoothblog.database import db
+from smoothblog.models import Blog, User
+from smoothblog.seed import seed
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench"
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "admin"
+
+
+def make_app(db_path, **config):
+    """Create an app on `db_path`."""
+    return create_app(
+        {
+            "SECRET_KEY": "benchmark",
+            "WTF_CSRF_ENABLED": False,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + db_path,
+            "ADMIN_EMAIL": ADMIN_EMAIL,
+            "ADMIN_USERNAME": "admin",
+            "ADMIN_PASSWORD": ADMIN_PASSWORD,
+            **config,
+        }
+    )
+
+
+def seeded_database(blogs):
+    """Return the path of a database holding `blogs` blogs, seeding it if needed."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    db_path = os.path.join(DATA_DIR, f"blogs-{blogs}.sqlite")
+    if os.path.exists(db_path):
+        # Seeded by an older release, or before the latest migration.
+        with make_app(db_path).app_context():
+            migrations.upgrade()
+            db.engine.dispose()
+        return db_path
+
+    print(f"Seeding {blogs} blogs into {db_path}...", file=sys.stderr)
+    app = make_app(db_path + ".partial")
+    with app.app_context():
+        init_db()
+        seed(max(blogs // 100, 10), blogs, rng=random.Random(blogs))
+        db.session.add(User(BENCH_EMAIL, "bench", BENCH_PASSWORD))
+        db.session.commit()
+        db.engine.dispose()
+    os.replace(db_path + ".partial", db_path)
+    return db_path
+
+
+class StatementCounter:
+    """Counts the SQL statements sent to the database."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def _login(client, email, password):
+    response = client.post("/auth/login", data={"email": email, "password": password})
+    assert response.status_code == 302, f"could not log in as {email}"
+
+
+def _scenarios(app, requests):
+    """Yield `(route, request)` pairs, where `request` performs one request."""
+    anonymous = app.test_client()
+    yield "/home", lambda i: anonymous.get("/home")
+
+    yield "/auth/login", lambda i: app.test_client().post(
+        "/auth/login", data={"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+    )
+
+    author = app.test_client()
+    _login(author, BENCH_EMAIL, BENCH_PASSWORD)
+    yield "/create", lambda i: author.post(
+        "/create", data={"title": f"bench {i}", "content": "benchmark content " * 50}
+    )
+
+    with app.app_context():
+        bench_id = User.query.filter_by(email=BENCH_EMAIL).one().id
+        blog_ids = [
+            blog_id
+            for (blog_id,) in db.session.execute(
+                db.select(Blog.id)
+                .where(Blog.user_id == bench_id)
+                .order_by(Blog.id.desc())
+                .limit(requests + 1)
+            )
+        ]
+    yield "/delete/<id>", lambda i: author.get(f"/delete/{blog_ids[i]}")
+
+    admin = app.test_client()
+    _login(admin, ADMIN_EMAIL, ADMIN_PASSWORD)
+    yield "/auth/admin", lambda i: admin.get("/auth/admin")
+
+
+def measure(request, requests, counter):
+    """Time `requests` calls of `request` and summarize them."""
+    latencies = []
+    statements = []
+    for i in range(1, requests + 1):
+        counter.count = 0
+        start = time.perf_counter()
+        response = request(i)
+        latencies.append(time.perf_counter() - start)
+        statements.append(counter.count)
+        assert response.status_code < 400, f"request failed with {response.status}"
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": requests,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": quantiles[49] * 1000,
+        "p90_ms": quantiles[89] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "throughput_rps": requests / sum(latencies),
+        "statements": max(statements),
+    }
+
+
+def run(blogs, requests, config):
+    """Benchmark every route against a database of `blogs` blogs."""
+    app = make_app(seeded_database(blogs), **config)
+    counter = StatementCounter()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", counter)
+
+    results = {}
+    for route, request in _scenarios(app, requests):
+        request(0)  # warm up templates and connections; requests use 1..n
+        results[route] = measure(request, requests, counter)
+        print(f"  {route:<14} {_describe(results[route])}", file=sys.stderr)
+
+    with app.app_context():
+        db.engine.dispose()
+    return results
+
+
+def _describe(result):
+    return (
+        f"p50 {result['p50_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+        f"{result['throughput_rps']:8.1f} req/s  {result['statements']} statements"
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of every regression against `baseline`."""
+    regressions = []
+    for size, routes in results["sizes"].items():
+        for route, result in routes.items():
+            before = baseline.get("sizes", {}).get(size, {}).get(route)
+            if before is None:
+                continue
+
+            if result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{route} at {size} blogs: p50 {before['p50_ms']:.2f}ms -> "
+                    f"{result['p50_ms']:.2f}ms"
+                )
+            if result["statements"] > before["statements"]:
+                regressions.append(
+                    f"{route} at {size} blogs: {before['statements']} -> "
+                    f"{result['statements']} statements"
+                )
+    return regressions
+
+
+def main():
+    """Parse arguments, run the benchmark and compare it with the baseline."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare with results saved earlier.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative p50 slowdown before a route counts as a regression.",
+    )
+    parser.add_argument(
+        "--response-cache",
+        action="store_true",
+        help="Leave the response cache on instead of measuring the uncached views.",
+    )
+    args = parser.parse_args()
+
+    # Every login attempt is for the same account, which the throttle would reject.
+    config = {
+        "RESPONSE_CACHE_ENABLED": args.response_cache,
+        "LOGIN_THROTTLE_ENABLED": False,
+    }
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "sizes": {},
+    }
+    for size in args.sizes:
+        print(f"{size} blogs:", file=sys.stderr)
+        results["sizes"][str(size)] = run(size, args.requests, config)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Measure read throughput of the home page while another process keeps writing.
+
+Runs the same workload with SQLite's defaults and with the app's tuned pragmas:
+
+    python -m benchmarks.sqlite_concurrency --readers 4 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from smoothblog import create_app
+from smoothblog.cli import init_db
+from smoothblog.database import db
+from smoothblog.models import Blog
+
+
+def make_app(db_path, pragmas):
+    """Create an app on `db_path`, using the default pragmas unless given some."""
+    config = {
+        "SECRET_KEY": "benchmark",
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + db_path,
+        "ADMIN_EMAIL": "admin@email.com",
+        "ADMIN_USERNAME": "admin",
+        "ADMIN_PASSWORD": "admin",
+        "RESPONSE_CACHE_ENABLED": False,
+    }
+    if pragmas is not None:
+        config["SQLITE_PRAGMAS"] = pragmas
+    return create_app(config)
+
+
+def setup(db_path, pragmas, blogs):
+    """Create a database holding `blogs` rows."""
+    app = make_app(db_path, pragmas)
+    with app.app_context():
+        init_db()
+        db.session.execute(
+            insert(Blog),
+            [
+                {"title": f"title {i}", "content": "content " * 50, "user_id": 1}
+                for i in range(blogs)
+            ],
+        )
+        db.session.commit()
+        db.engine.dispose()
+
+
+def reader(db_path, pragmas, seconds, results):
+    """Request the home page in a loop."""
+    client = make_app(db_path, pragmas).test_client()
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if client.get("/home").status_code == 200:
+            done += 1
+        else:
+            errors += 1
+    results.put(("read", done, errors))
+
+
+def writer(db_path, pragmas, seconds, results):
+    """Commit one new blog at a time, like `blog.create` does."""
+    app = make_app(db_path, pragmas)
+    done = errors = 0
+    with app.app_context():
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            try:
+                db.session.add(Blog("new title", "new content " * 50, 1))
+                db.session.commit()
+                done += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    results.put(("write", done, errors))
+
+
+def run(pragmas, args):
+    """Run one workload and return totals per kind of operation."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.sqlite")
+        setup(db_path, pragmas, args.blogs)
+
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(
+                target=reader, args=(db_path, pragmas, args.seconds, results)
+            )
+            for _ in range(args.readers)
+        ]
+        workers.append(
+            multiprocessing.Process(
+                target=writer, args=(db_path, pragmas, args.seconds, results)
+            )
+        )
+        for worker in workers:
+            worker.start()
+
+        totals = {"read": [0, 0], "write": [0, 0]}
+        for _ in workers:
+            kind, done, errors = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+        for worker in workers:
+            worker.join()
+
+    return totals
+
+
+def main():
+    """Parse arguments and print a before/after comparison."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--blogs", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'pragmas':<10} {'reads/s':>10} {'writes/s':>10} {'errors':>8}")
+    for label, pragmas in (("default", {}), ("tuned", None)):
+        totals = run(pragmas, args)
+        print(
+            f"{label:<10} {totals['read'][0] / args.seconds:>10.1f} "
+            f"{totals['write'][0] / args.seconds:>10.1f} "
+            f"{totals['read'][1] + totals['write'][1]:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
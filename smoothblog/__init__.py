@@ -1,15 +1,37 @@
 """A Flask based app that allows users to create blogs. """
 
+import logging
 import os
 from logging.config import dictConfig
 
 from dotenv import load_dotenv
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-from . import auth, blog
-from .cli import init_db_command
-from .database import db
-from .login_manager import lm
+from . import api, assets, auth, blog, logs
+from .cache import response_cache
+from .cli import (
+    backfill_excerpts_command,
+    build_assets_command,
+    export_command,
+    import_command,
+    init_db_command,
+    rebuild_search_index_command,
+    reconcile_counters_command,
+    resume_deletions_command,
+    seed_command,
+    upgrade_db_command,
+)
+from .compression import COMPRESSIBLE, init_compression
+from .database import db, init_sqlite
+from .deletion import init_deletion
+from .fragments import init_post_cache
+from .instrumentation import init_instrumentation
+from .login_manager import init_user_cache, lm
+from .passwords import DEFAULT_METHOD, init_passwords
+from .search import init_search
+from .throttle import init_login_throttle
+from .versions import init_versions
 
 load_dotenv()
 
@@ -17,6 +39,56 @@ load_dotenv()
 def create_app(test_config=None):
     """Initialize the app and configure it."""
     app = Flask(__name__)
+    app.config.from_mapping(
+        ADMIN_PAGE_SIZE=50,
+        API_MAX_PAGE_SIZE=100,
+        API_TOKEN_MAX_AGE=60 * 60,
+        BLOG_PAGE_SIZE=20,
+        COMPRESSION_ENABLED=True,
+        COMPRESSION_LEVEL=6,
+        COMPRESSION_BROTLI_QUALITY=4,
+        COMPRESSION_MIN_SIZE=1024,
+        COMPRESSION_STREAM_CHUNK_SIZE=4096,
+        COMPRESSION_MIMETYPES=COMPRESSIBLE,
+        FEED_SIZE=20,
+        FEED_CACHE_TTL=24 * 60 * 60,
+        POST_CACHE_BACKEND=None,
+        POST_CACHE_SIZE=1024,
+        POST_CACHE_TTL=60 * 60,
+        RESPONSE_CACHE_ENABLED=True,
+        RESPONSE_CACHE_BACKEND=None,
+        RESPONSE_CACHE_SIZE=256,
+        RESPONSE_CACHE_TTL=60,
+        LOGIN_THROTTLE_ENABLED=True,
+        LOGIN_THROTTLE_BACKEND=None,
+        LOGIN_THROTTLE_SIZE=10000,
+        LOGIN_THROTTLE_IP_PER_MINUTE=30,
+        LOGIN_THROTTLE_IP_BURST=20,
+        LOGIN_THROTTLE_EMAIL_PER_MINUTE=5,
+        LOGIN_THROTTLE_EMAIL_BURST=10,
+        PASSWORD_HASH_METHOD=DEFAULT_METHOD,
+        PASSWORD_HASH_WORKERS=0,
+        PASSWORD_HASH_CONCURRENCY=8,
+        PASSWORD_HASH_TIMEOUT=5,
+        SERVER_TIMING=True,
+        STREAM_LISTINGS=False,
+        STREAM_LISTINGS_BATCH_SIZE=100,
+        SLOW_QUERY_THRESHOLD_MS=100,
+        USER_DELETE_MODE="inline",
+        USER_DELETE_CHUNK_SIZE=1000,
+        USER_CACHE_BACKEND=None,
+        USER_CACHE_SIZE=1024,
+        USER_CACHE_TTL=30,
+        TRUSTED_PROXIES=0,
+        SQLITE_PRAGMAS={
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,
+            "busy_timeout": 5000,
+            "foreign_keys": "ON",
+        },
+    )
 
     if test_config:
         app.config.from_mapping(test_config)
@@ -30,33 +102,83 @@ def create_app(test_config=None):
             ADMIN_USERNAME=os.environ["ADMIN_USERNAME"],
             ADMIN_PASSWORD=os.environ["ADMIN_PASSWORD"],
         )
+        app.config.from_prefixed_env("SMOOTHBLOG")
 
         os.makedirs(app.instance_path, exist_ok=True)
 
         _init_logging(app)
 
+    if app.config["TRUSTED_PROXIES"]:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["TRUSTED_PROXIES"])
+
     db.init_app(app)
+    init_sqlite(app)
+    init_search(app)
+    init_instrumentation(app)
+    # After instrumentation, so the version check counts towards the request.
+    init_versions(app)
+    init_compression(app)
+    init_passwords(app)
+    init_login_throttle(app)
+    response_cache.init_app(app)
     app.cli.add_command(init_db_command)
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(backfill_excerpts_command)
+    app.cli.add_command(reconcile_counters_command)
+    app.cli.add_command(resume_deletions_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_command)
+    app.cli.add_command(seed_command)
 
     lm.login_view = "auth.login"
     lm.login_message_category = "info"
     lm.init_app(app)
+    init_user_cache(app)
+    init_post_cache(app)
+    init_deletion(app)
+    assets.init_assets(app)
 
     app.register_blueprint(blog.bp, url_prefix="/")
     app.register_blueprint(auth.bp, url_prefix="/auth")
+    app.register_blueprint(api.bp, url_prefix="/api/v1")
+    app.register_blueprint(assets.bp, url_prefix="/assets")
 
     return app
 
 
+def _file_handler(app, filename, level):
+    handler = {
+        "filename": os.path.join(app.instance_path, filename),
+        "formatter": "default",
+        "level": level,
+        "backupCount": int(os.environ.get("LOG_BACKUP_COUNT", 5)),
+    }
+    if os.environ.get("LOG_ROTATION", "size") == "time":
+        handler["class"] = "logging.handlers.TimedRotatingFileHandler"
+        handler["when"] = os.environ.get("LOG_ROTATE_WHEN", "midnight")
+    else:
+        handler["class"] = "logging.handlers.RotatingFileHandler"
+        handler["maxBytes"] = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    return handler
+
+
 def _init_logging(app):
+    if os.environ.get("LOG_JSON", "").lower() in ("1", "true"):
+        formatter = {"()": "smoothblog.logs.JsonFormatter"}
+    else:
+        formatter = {
+            "format": "[%(asctime)s] %(levelname)s in %(module)s: %(message)s",
+        }
+
+    logs.stop_listeners()
     dictConfig(
         {
             "version": 1,
-            "formatters": {
-                "default": {
-                    "format": "[%(asctime)s] %(levelname)s in %(module)s: %(message)s",
-                }
-            },
+            # Loggers such as `app.logger` may already exist when the app is made again.
+            "disable_existing_loggers": False,
+            "formatters": {"default": formatter},
             "handlers": {
                 "wsgi": {
                     "class": "logging.StreamHandler",
@@ -64,13 +186,28 @@ def _init_logging(app):
                     "formatter": "default",
                     "level": "WARNING",
                 },
-                "file": {
-                    "class": "logging.FileHandler",
-                    "filename": os.path.join(app.instance_path, os.environ["LOG_FILE"]),
-                    "formatter": "default",
-                    "level": "INFO",
+                "file": _file_handler(app, os.environ["LOG_FILE"], "INFO"),
+                "slow_queries": _file_handler(
+                    app,
+                    os.environ.get("SLOW_QUERY_LOG_FILE", "slow_queries.log"),
+                    "WARNING",
+                ),
+            },
+            "loggers": {
+                "smoothblog.slow_queries": {
+                    "level": "WARNING",
+                    "handlers": ["slow_queries"],
+                    "propagate": False,
                 },
             },
             "root": {"level": "INFO", "handlers": ["wsgi", "file"]},
         }
     )
+
+    # Only enqueue on the request thread; a listener thread does the writing. The
+    # wsgi handler stays put, since only the request thread can see the request's
+    # wsgi.errors stream, and it only writes warnings.
+    size = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+    policy = os.environ.get("LOG_QUEUE_POLICY", "drop")
+    logs.queue_handlers(logging.getLogger(), size, policy, keep=("wsgi",))
+    logs.queue_handlers(logging.getLogger("smoothblog.slow_queries"), size, policy)
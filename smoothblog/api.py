@@ -0,0 +1,216 @@
+"""Versioned JSON API for blogs."""
+
+from datetime import datetime
+
+from flask import Blueprint, current_app, request, url_for
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy.exc import IntegrityError
+
+from .cache import response_cache
+from .counters import adjust_post_counters
+from .database import db
+from .fragments import forget_posts
+from .models import Blog, User
+from .pagination import InvalidCursor, keyset_paginate
+from .passwords import HashingBusy, verify_password
+from .throttle import login_retry_after
+
+bp = Blueprint("api", __name__)
+
+FIELDS = {
+    "id": Blog.id,
+    "title": Blog.title,
+    "content": Blog.content,
+    "excerpt": Blog.excerpt,
+    "word_count": Blog.word_count,
+    "reading_time": Blog.reading_time,
+    "date": Blog.date,
+    "user_id": Blog.user_id,
+    "author": User.username,
+}
+LIST_FIELDS = ("id", "title", "date", "user_id", "author")
+
+# Listings are ordered by these, so they are always selected for the cursors.
+_KEYS = (Blog.date, Blog.id)
+
+
+def _error(status, message, headers=None):
+    return {"error": message}, status, headers or {}
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="api-token")
+
+
+def _token_user():
+    """The `{"id": ...}` claims of a valid bearer token, or `None`."""
+    auth = request.authorization
+    if auth is None or auth.type != "bearer" or not auth.token:
+        return None
+    try:
+        return _serializer().loads(
+            auth.token, max_age=current_app.config["API_TOKEN_MAX_AGE"]
+        )
+    except BadSignature:
+        return None
+
+
+def _is_admin(user_id):
+    return bool(
+        db.session.execute(db.select(User.is_admin).where(User.id == user_id)).scalar()
+    )
+
+
+def _fields(default):
+    names = request.args.get("fields")
+    if not names:
+        return default
+    names = tuple(name.strip() for name in names.split(","))
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def _select(names):
+    """Query the columns of `names` plus the sort keys, as plain row tuples."""
+    columns = [FIELDS[name].label(name) for name in names]
+    columns += [key for key in _KEYS if key.key not in names]
+    query = db.session.query(*columns)
+    if "author" in names:
+        query = query.join(User, User.id == Blog.user_id)
+    return query
+
+
+def _serialize(row, names):
+    return {
+        name: value.isoformat() if isinstance(value, datetime) else value
+        for name, value in zip(names, row)
+    }
+
+
+@bp.route("/blogs")
+def list_blogs():
+    """A page of blogs, newest first."""
+    try:
+        names = _fields(LIST_FIELDS)
+    except ValueError as exc:
+        return _error(400, str(exc))
+
+    limit = request.args.get("limit", current_app.config["BLOG_PAGE_SIZE"], int)
+    limit = min(max(limit, 1), current_app.config["API_MAX_PAGE_SIZE"])
+    try:
+        page = keyset_paginate(
+            _select(names),
+            _KEYS,
+            limit,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+        )
+    except InvalidCursor:
+        return _error(400, "Invalid cursor.")
+
+    return {
+        "items": [_serialize(row, names) for row in page.items],
+        "next": page.next_cursor,
+        "prev": page.prev_cursor,
+    }
+
+
+@bp.route("/blogs/<int:blog_id>")
+def get_blog(blog_id):
+    """A single blog."""
+    try:
+        names = _fields(tuple(FIELDS))
+    except ValueError as exc:
+        return _error(400, str(exc))
+
+    row = _select(names).filter(Blog.id == blog_id).first()
+    if row is None:
+        return _error(404, "Blog does not exist.")
+    return _serialize(row, names)
+
+
+@bp.route("/blogs", methods=["POST"])
+def create_blog():
+    """Create a blog as the token's user."""
+    user = _token_user()
+    if user is None:
+        return _error(401, "A valid bearer token is required.")
+
+    data = request.get_json(silent=True) or {}
+    title, content = data.get("title"), data.get("content")
+    if not isinstance(title, str) or not title.strip():
+        return _error(400, "title is required.")
+    if len(title) > Blog.title.type.length:
+        return _error(400, f"title is longer than {Blog.title.type.length} characters.")
+    if not isinstance(content, str) or not content.strip():
+        return _error(400, "content is required.")
+
+    blog = Blog(title, content, user["id"])
+    db.session.add(blog)
+    try:
+        db.session.flush()
+        adjust_post_counters(user["id"], 1)
+        db.session.commit()
+    except IntegrityError:
+        # The token outlived its user.
+        db.session.rollback()
+        return _error(401, "A valid bearer token is required.")
+    response_cache.clear()
+
+    names = tuple(FIELDS)
+    location = url_for("api.get_blog", blog_id=blog.id)
+    row = _select(names).filter(Blog.id == blog.id).one()
+    return _serialize(row, names), 201, {"Location": location}
+
+
+@bp.route("/blogs/<int:blog_id>", methods=["DELETE"])
+def delete_blog(blog_id):
+    """Delete a blog of the token's user, or any blog if that user is an admin."""
+    user = _token_user()
+    if user is None:
+        return _error(401, "A valid bearer token is required.")
+
+    owner = db.session.execute(
+        db.select(Blog.user_id).where(Blog.id == blog_id)
+    ).first()
+    if owner is None:
+        return _error(404, "Blog does not exist.")
+    if owner.user_id != user["id"] and not _is_admin(user["id"]):
+        return _error(403, "Blog cannot be deleted.")
+
+    db.session.execute(db.delete(Blog).where(Blog.id == blog_id))
+    adjust_post_counters(owner.user_id, -1)
+    db.session.commit()
+    forget_posts([blog_id])
+    response_cache.clear()
+    return "", 204
+
+
+@bp.route("/tokens", methods=["POST"])
+def create_token():
+    """Exchange an email and password for a bearer token."""
+    data = request.get_json(silent=True) or {}
+    email, password = data.get("email"), data.get("password")
+    if not isinstance(email, str) or not isinstance(password, str):
+        return _error(400, "email and password are required.")
+
+    retry_after = login_retry_after(request.remote_addr, email)
+    if retry_after:
+        return _error(
+            429, "Too many login attempts.", {"Retry-After": str(retry_after)}
+        )
+
+    user = db.session.execute(
+        db.select(User.id, User.password).where(User.email == email)
+    ).first()
+    try:
+        valid = user is not None and verify_password(user.password, password)
+    except HashingBusy:
+        return _error(503, "The server is busy.", {"Retry-After": "1"})
+    if not valid:
+        return _error(401, "Incorrect email or password.")
+
+    token = _serializer().dumps({"id": user.id})
+    return {"token": token, "expires_in": current_app.config["API_TOKEN_MAX_AGE"]}
@@ -1,18 +1,46 @@
 """Authentication related routes."""
 
-from flask import Blueprint, flash, redirect, render_template, url_for
+import sys
+
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
 from flask_login import current_user, login_required, login_user, logout_user
 from sqlalchemy.exc import IntegrityError
-from werkzeug.security import check_password_hash
 
+from . import logs
 from .database import db
-from .forms import LoginForm, RegisterForm
+from .deletion import schedule_deletion
+from .forms import DeleteUsersForm, LoginForm, RegisterForm
 from .login_manager import logout_required
-from .models import Blog, User
+from .models import User
+from .pagination import StreamedPage, page_number
+from .passwords import HashingBusy, hash_password, needs_rehash, verify_password
+from .streaming import listing_batch_size, render_listing
+from .throttle import login_retry_after
 
 bp = Blueprint("auth", __name__)
 
 
+def _retry_later(template, form, status=503, retry_after=1):
+    if status == 429:
+        flash("Too many login attempts, please try again later.", "danger")
+    else:
+        flash("The server is busy, please try again in a moment.", "danger")
+    return (
+        render_template(template, form=form),
+        status,
+        {"Retry-After": str(retry_after)},
+    )
+
+
 @bp.route("/register", methods=["GET", "POST"])
 @logout_required
 def register():
@@ -23,7 +51,10 @@ def register():
         username = form.username.data
         password = form.password.data
 
-        new_user = User(email, username, password)
+        try:
+            new_user = User(email, username, password)
+        except HashingBusy:
+            return _retry_later("auth/register.html", form)
 
         try:
             db.session.add(new_user)
@@ -51,9 +82,26 @@ def login():
         password = form.password.data
         remember = form.remember.data
 
+        retry_after = login_retry_after(request.remote_addr, email)
+        if retry_after:
+            return _retry_later("auth/login.html", form, 429, retry_after)
+
         user = User.query.filter_by(email=email).first()
         if user:
-            if check_password_hash(user.password, password):
+            try:
+                valid = verify_password(user.password, password)
+            except HashingBusy:
+                return _retry_later("auth/login.html", form)
+
+            if valid and needs_rehash(user.password):
+                try:
+                    user.password = hash_password(password)
+                    db.session.commit()
+                except HashingBusy:
+                    # Upgrading the hash can wait for a later login.
+                    pass
+
+            if valid:
                 login_user(user, remember=remember)
                 flash(f"Welcome back, {user.username}!", "success")
                 if user.is_admin:
@@ -78,13 +126,152 @@ def logout():
     return redirect(url_for("blog.home"))
 
 
+ADMIN_SORTS = {
+    "username": User.username,
+    "email": User.email,
+    "blog_count": User.post_count,
+    "last_post": User.last_posted_at,
+}
+
+
+def _starts_with(column, prefix):
+    # A range rather than LIKE, so the unique index on the column can be used. The
+    # upper bound bumps the last character that can be bumped, skipping surrogates,
+    # which cannot be encoded; a prefix of nothing but U+10FFFF has no upper bound.
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return column >= prefix
+    last = ord(stem[-1]) + 1
+    if 0xD800 <= last <= 0xDFFF:
+        last = 0xE000
+    return db.and_(column >= prefix, column < stem[:-1] + chr(last))
+
+
+def _admin_users(prefix, sort, descending, page, per_page):
+    """Build the query for one admin page, using the stored post counters.
+
+    Asks for one extra row so the caller can tell whether there is a next page.
+    """
+    query = db.select(
+        User.id,
+        User.email,
+        User.username,
+        User.is_admin,
+        User.post_count.label("blog_count"),
+        User.last_posted_at.label("last_post"),
+    )
+    if prefix:
+        query = query.where(
+            db.or_(
+                _starts_with(User.username, prefix),
+                _starts_with(User.email, prefix),
+            )
+        )
+
+    column = ADMIN_SORTS[sort]
+    if descending:
+        query = query.order_by(column.desc(), User.id.desc())
+    else:
+        query = query.order_by(column.asc(), User.id.asc())
+    return query.limit(per_page + 1).offset((page - 1) * per_page)
+
+
 @bp.route("/admin")
 @login_required
 def admin():
-    """View all users."""
+    """View a page of users, optionally filtered by a username or email prefix."""
+    if current_user.is_admin:
+        prefix = request.args.get("q", "").strip()
+        sort = request.args.get("sort", "username")
+        if sort not in ADMIN_SORTS:
+            sort = "username"
+        descending = request.args.get("order") == "desc"
+        page = page_number(request.args)
+        if page is None:
+            abort(400)
+
+        per_page = current_app.config["ADMIN_PAGE_SIZE"]
+        query = _admin_users(prefix, sort, descending, page, per_page)
+        batch_size = listing_batch_size()
+        if batch_size:
+            rows = db.session.execute(query.execution_options(yield_per=batch_size))
+        else:
+            rows = db.session.execute(query).all()
+        return render_listing(
+            "auth/admin.html",
+            users=StreamedPage(rows, per_page),
+            q=prefix,
+            sort=sort,
+            order="desc" if descending else "asc",
+            page=page,
+            delete_form=DeleteUsersForm(),
+        )
+
+    flash("You do not have permissions to access that page.", "danger")
+    return redirect(url_for("blog.home"))
+
+
+@bp.route("/admin/delete", methods=["POST"])
+@login_required
+def delete_selected():
+    """Delete every non-admin user selected on the admin page."""
     if current_user.is_admin:
-        users = User.query.all()
-        return render_template("auth/admin.html", users=users)
+        form = DeleteUsersForm()
+        if form.validate_on_submit():
+            selected = request.form.getlist("user_id", type=int)
+            user_ids = (
+                db.session.execute(
+                    db.select(User.id).where(
+                        User.id.in_(selected), User.is_admin.is_not(True)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            if not user_ids:
+                flash("No users were selected.", "danger")
+            elif schedule_deletion(user_ids):
+                flash(f"{len(user_ids)} users will be deleted shortly.", "success")
+            else:
+                flash(f"Deleted {len(user_ids)} users.", "success")
+
+        return redirect(url_for("auth.admin"))
+
+    flash("You do not have permissions to access that page.", "danger")
+    return redirect(url_for("blog.home"))
+
+
+@bp.route("/admin/metrics")
+@login_required
+def metrics():
+    """Export request, SQL and cache metrics in the Prometheus text format."""
+    if current_user.is_admin:
+        counters = {}
+        for name, label in (
+            ("response_cache", "Page"),
+            ("user_cache", "User"),
+            ("post_cache", "Post"),
+        ):
+            stats = current_app.extensions[name].stats()
+            for outcome in ("hits", "misses"):
+                counters[f"{name}_{outcome}_total"] = (
+                    f"{label} cache {outcome}.",
+                    stats[outcome],
+                )
+        throttle = current_app.extensions["login_throttle"].stats()
+        for outcome, help_text in (
+            ("allowed", "Login attempts let through."),
+            ("ip", "Login attempts rejected by the per IP limit."),
+            ("email", "Login attempts rejected by the per email limit."),
+        ):
+            counters[f"login_throttle_{outcome}_total"] = (help_text, throttle[outcome])
+        counters["log_records_dropped_total"] = (
+            "Log records dropped because the log queue was full.",
+            logs.dropped_records(),
+        )
+
+        body = current_app.extensions["metrics"].render(counters)
+        return current_app.response_class(body, mimetype="text/plain; version=0.0.4")
 
     flash("You do not have permissions to access that page.", "danger")
     return redirect(url_for("blog.home"))
@@ -95,14 +282,10 @@ def admin():
 def delete(user_id):
     """Delete specified user and all associated blogs."""
     if current_user.is_admin:
-        Blog.query.where(Blog.user_id == user_id).delete()
-
-        user = User.query.get(user_id)
-        if user:
-            db.session.delete(user)
-            db.session.commit()
-        else:
+        if not User.query.get(user_id):
             flash("User does not exist", "danger")
+        elif schedule_deletion([user_id]):
+            flash("The user will be deleted shortly.", "success")
 
         return redirect(url_for("auth.admin"))
 
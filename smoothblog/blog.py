@@ -1,13 +1,33 @@
 """Blog related routes."""
 
-from flask import Blueprint, flash, redirect, render_template, url_for
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
 from flask_login import current_user, login_required
+from sqlalchemy.orm import contains_eager, load_only
 
+from .cache import response_cache
+from .conditional import conditional
+from .counters import adjust_post_counters
 from .database import db
 from .forms import CreateBlogForm
+from .fragments import forget_posts, post_fragment
 from .models import Blog, User
+from .pagination import InvalidCursor, keyset_paginate, page_number
+from .search import highlight
+from .search import search as search_blogs
+from .streaming import listing_batch_size, render_listing
+from .versions import content_version
 
 bp = Blueprint("blog", __name__)
+bp.add_app_template_filter(highlight)
 
 
 @bp.route("/")
@@ -16,21 +36,156 @@ def index():
     return redirect(url_for("blog.home"))
 
 
+def _listing_query():
+    """Blogs with their authors, loading only what a listing shows, not the content."""
+    return Blog.query.join(Blog.user).options(
+        contains_eager(Blog.user).load_only(User.id, User.username, User.email),
+        load_only(
+            Blog.id,
+            Blog.title,
+            Blog.excerpt,
+            Blog.word_count,
+            Blog.reading_time,
+            Blog.date,
+            Blog.user_id,
+        ),
+    )
+
+
+def _listing_validators():
+    """Validators of the listings: the content version and the time it last moved.
+
+    Both change with every blog or author change, including deletions and backfills.
+    """
+    current = content_version()
+    return current.version, current.changed_at
+
+
 @bp.route("/home")
+@conditional(_listing_validators)
+@response_cache.cached
 def home():
-    """Main page that shows all blogs."""
-    order = Blog.date.desc()  # pylint: disable=no-member
-    blogs = Blog.query.order_by(order).join(User).all()
-
-    return render_template("blog/home.html", blogs=blogs)
+    """Main page that shows the newest blogs, one page at a time."""
+    try:
+        page = keyset_paginate(
+            _listing_query(),
+            (Blog.date, Blog.id),
+            current_app.config["BLOG_PAGE_SIZE"],
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            yield_per=listing_batch_size(),
+        )
+    except InvalidCursor:
+        abort(400)
+
+    return render_listing("blog/home.html", blogs=page.items, page=page)
+
+
+FEED_TYPES = {"atom": "application/atom+xml", "rss": "application/rss+xml"}
+
+
+def _feed(kind):
+    """Serialize the newest blogs as a feed, reusing the XML until the listings change.
+
+    The cache key includes the content version, so any change to the blogs makes the
+    next poll render a fresh feed while unchanged feeds are served as stored.
+    """
+    version, _, updated = content_version()
+    state = current_app.extensions["response_cache"]
+    enabled = current_app.config["RESPONSE_CACHE_ENABLED"]
+    key = f"feed|{kind}|{version}|{request.url_root}"
+
+    body = state.backend.get(key) if enabled else None
+    if enabled:
+        state.count(hit=body is not None)
+    if body is None:
+        blogs = (
+            _listing_query()
+            .order_by(Blog.date.desc(), Blog.id.desc())
+            .limit(current_app.config["FEED_SIZE"])
+        )
+        body = render_template(
+            f"blog/feed.{kind}.xml", blogs=blogs, updated=updated
+        ).encode()
+        if enabled:
+            state.backend.set(key, body, current_app.config["FEED_CACHE_TTL"])
+
+    return current_app.response_class(body, mimetype=FEED_TYPES[kind])
+
+
+@bp.route("/feed.atom")
+@conditional(_listing_validators)
+def atom_feed():
+    """Atom feed of the newest blogs."""
+    return _feed("atom")
+
+
+@bp.route("/feed.rss")
+@conditional(_listing_validators)
+def rss_feed():
+    """RSS feed of the newest blogs."""
+    return _feed("rss")
+
+
+@bp.route("/user/<username>")
+@response_cache.cached
+def author(username):
+    """One author's blogs, newest first, one page at a time."""
+    user = db.session.execute(
+        db.select(
+            User.id, User.username, User.email, User.post_count, User.last_posted_at
+        ).where(User.username == username)
+    ).first()
+    if user is None:
+        abort(404)
+
+    try:
+        # Served by the (user_id, date, id) index.
+        page = keyset_paginate(
+            _listing_query().filter(Blog.user_id == user.id),
+            (Blog.date, Blog.id),
+            current_app.config["BLOG_PAGE_SIZE"],
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            yield_per=listing_batch_size(),
+        )
+    except InvalidCursor:
+        abort(400)
+
+    return render_listing("blog/author.html", author=user, blogs=page.items, page=page)
+
+
+@bp.route("/blog/<int:blog_id>")
+def post(blog_id):
+    """A single blog with its full content, rendered from the post cache."""
+    fragment = post_fragment(blog_id)
+    if fragment is None:
+        abort(404)
+
+    return render_template("blog/post.html", post=fragment, blog_id=blog_id)
 
 
 @bp.route("/about")
+@response_cache.cached
 def about():
     """About page."""
     return render_template("blog/about.html")
 
 
+@bp.route("/search")
+def search():
+    """Search blogs by title and content, best matches first."""
+    terms = request.args.get("q", "").strip()
+    page = page_number(request.args)
+    if page is None:
+        abort(400)
+    results, has_next = search_blogs(terms, page, current_app.config["BLOG_PAGE_SIZE"])
+
+    return render_template(
+        "blog/search.html", terms=terms, results=results, page=page, has_next=has_next
+    )
+
+
 @bp.route("/create", methods=["GET", "POST"])
 @login_required
 def create():
@@ -42,7 +197,10 @@ def create():
 
         new_blog = Blog(title, content, current_user.id)
         db.session.add(new_blog)
+        db.session.flush()
+        adjust_post_counters(current_user.id, 1)
         db.session.commit()
+        response_cache.clear()
 
         flash("Blog successfully created!", "success")
         return redirect(url_for("blog.home"))
@@ -60,7 +218,11 @@ def delete(blog_id):
     blog = Blog.query.get(blog_id)
     if blog and (current_user.is_admin or current_user.id == blog.user_id):
         db.session.delete(blog)
+        db.session.flush()
+        adjust_post_counters(blog.user_id, -1)
         db.session.commit()
+        forget_posts([blog_id])
+        response_cache.clear()
     else:
         flash("Blog cannot be deleted.", "danger")
 
@@ -0,0 +1,197 @@
+"""Caches whole pages rendered for anonymous visitors."""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+
+class CacheBackend:
+    """Interface shared by every cache backend."""
+
+    def get(self, key):
+        """Return the value stored under `key`, or `None` if missing or expired."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        """Store `value` under `key` for `ttl` seconds."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Forget the value stored under `key`."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Forget every stored value."""
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """Thread safe in-process cache that evicts the least recently used entry."""
+
+    def __init__(self, maxsize=256, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    """Cache shared between workers through a client speaking Redis GET/SET/DEL/INCR.
+
+    Clearing bumps a generation number that is part of every key, so stale entries
+    are never read again and simply expire on the server.
+    """
+
+    def __init__(self, client, prefix="smoothblog"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key):
+        generation = int(self.client.get(f"{self.prefix}:generation") or 0)
+        return f"{self.prefix}:{generation}:{key}"
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self._key(key), pickle.dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        self.client.incr(f"{self.prefix}:generation")
+
+
+class CacheState:
+    """A backend together with its TTL and hit/miss counters."""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def count(self, hit):
+        """Record a cache hit or miss."""
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """Hit and miss counters."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class ResponseCache:
+    """Flask extension that caches responses of the views it decorates.
+
+    Only `GET` requests from anonymous visitors without pending flash messages are
+    served from or stored in the cache, since every other page can differ per user.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the configured backend for `app`."""
+        backend = app.config["RESPONSE_CACHE_BACKEND"] or LRUCache(
+            app.config["RESPONSE_CACHE_SIZE"]
+        )
+        app.extensions["response_cache"] = CacheState(
+            backend, app.config["RESPONSE_CACHE_TTL"]
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["response_cache"]
+
+    def cached(self, view):
+        """Decorator that serves `view` from the cache when it is safe to."""
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _cacheable():
+                return view(*args, **kwargs)
+
+            state = self._state()
+            entry = state.backend.get(request.url)
+            state.count(hit=entry is not None)
+            if entry is not None:
+                body, mimetype = entry
+                response = current_app.response_class(body, mimetype=mimetype)
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if (
+                response.status_code == 200
+                and not response.is_streamed
+                and not session.modified
+            ):
+                state.backend.set(
+                    request.url, (response.get_data(), response.mimetype), state.ttl
+                )
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    def clear(self):
+        """Drop every cached response; call after committing a visible change."""
+        self._state().backend.clear()
+
+    def stats(self):
+        """Hit and miss counters of the current app."""
+        return self._state().stats()
+
+
+def _cacheable():
+    return (
+        current_app.config["RESPONSE_CACHE_ENABLED"]
+        and request.method == "GET"
+        and not current_user.is_authenticated
+        and "_flashes" not in session
+    )
+
+
+response_cache = ResponseCache()
@@ -1,16 +1,24 @@
 """Adds commands to the `flask` cli."""
 
+import random
+import time
+
 import click
 from flask import current_app
+from flask.cli import with_appcontext
 
+from . import assets, migrations, search, seed, transfer
+from .counters import reconcile_post_counters
 from .database import db
-from .models import User
+from .deletion import resume_deletions
+from .models import Blog, User, summarize
 
 
 def init_db():
     """Drops previous database and initializes a new one."""
     db.drop_all()
     db.create_all()
+    migrations.stamp()
 
     email = current_app.config["ADMIN_EMAIL"]
     username = current_app.config["ADMIN_USERNAME"]
@@ -27,3 +35,128 @@ def init_db_command():
     """Creates a CLI command to initialize the database."""
     init_db()
     click.echo("Initialized the database.")
+
+
+@click.command("upgrade-db")
+@with_appcontext
+def upgrade_db_command():
+    """Creates a CLI command to migrate an existing database to the latest schema."""
+    applied = migrations.upgrade()
+    for name in applied:
+        click.echo(f"Applied {name}.")
+    click.echo(f"Database is at schema version {migrations.head()}.")
+
+
+@click.command("rebuild-search-index")
+@with_appcontext
+def rebuild_search_index_command():
+    """Creates a CLI command to rebuild the full text search index in bulk."""
+    with db.engine.begin() as connection:
+        search.create_index(connection)
+        search.rebuild_index(connection)
+    click.echo("Rebuilt the search index.")
+
+
+@click.command("backfill-excerpts")
+@click.option("--batch-size", default=1000, show_default=True)
+@with_appcontext
+def backfill_excerpts_command(batch_size):
+    """Creates a CLI command to compute missing excerpts, one batch at a time."""
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Blog.id, Blog.content)
+            .where(Blog.id > last_id, Blog.excerpt.is_(None))
+            .order_by(Blog.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for blog_id, content in rows:
+            excerpt, word_count, reading_time = summarize(content)
+            updates.append(
+                {
+                    "id": blog_id,
+                    "excerpt": excerpt,
+                    "word_count": word_count,
+                    "reading_time": reading_time,
+                }
+            )
+        db.session.execute(db.update(Blog), updates)
+        db.session.commit()
+        total += len(rows)
+        last_id = rows[-1].id
+    click.echo(f"Backfilled {total} excerpts.")
+
+
+@click.command("reconcile-counters")
+@with_appcontext
+def reconcile_counters_command():
+    """Creates a CLI command to recount every user's posts in bulk."""
+    drifted = reconcile_post_counters()
+    db.session.commit()
+    click.echo(f"Fixed the counters of {drifted} users.")
+
+
+@click.command("resume-deletions")
+@with_appcontext
+def resume_deletions_command():
+    """Creates a CLI command to finish user deletions cut short by a restart."""
+    resumed = resume_deletions()
+    click.echo(f"Deleted {len(resumed)} users whose deletion was cut short.")
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Creates a CLI command to vendor, fingerprint and precompress static assets."""
+    manifest = assets.build(current_app.static_folder)
+    for name, filename in sorted(manifest.items()):
+        click.echo(f"{name} -> {filename}")
+    if assets.brotli is None:
+        click.echo("brotli is not installed, so only gzip variants were written.")
+
+
+@click.command("export")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--batch-size", default=1000, show_default=True)
+@with_appcontext
+def export_command(path, batch_size):
+    """Creates a CLI command to stream every user and blog to an NDJSON file."""
+    counts = transfer.export_rows(path, batch_size)
+    click.echo(f"Exported {counts['user']} users and {counts['blog']} blogs.")
+
+
+@click.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option(
+    "--checkpoint", help="Where to record progress. [default: PATH.checkpoint]"
+)
+@with_appcontext
+def import_command(path, batch_size, checkpoint):
+    """Creates a CLI command to load users and blogs from an NDJSON export."""
+    try:
+        counts = transfer.import_rows(path, batch_size, checkpoint)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(f"Imported {counts['user']} users and {counts['blog']} blogs.")
+
+
+@click.command("seed")
+@click.option("--users", default=100, show_default=True, help="Users to create.")
+@click.option("--blogs", default=1000, show_default=True, help="Blogs to create.")
+@click.option("--batch-size", default=5000, show_default=True)
+@click.option("--password", default="password", show_default=True)
+@click.option("--password-hash", help="Precomputed hash to give every new user.")
+@click.option("--random-seed", type=int, help="Seed for reproducible data.")
+@with_appcontext
+def seed_command(users, blogs, random_seed, **options):
+    """Creates a CLI command to bulk insert synthetic users and blogs."""
+    start = time.perf_counter()
+    seed.seed(users, blogs, rng=random.Random(random_seed), **options)
+    elapsed = time.perf_counter() - start
+    click.echo(f"Seeded {users} users and {blogs} blogs in {elapsed:.1f}s.")
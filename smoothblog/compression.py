@@ -0,0 +1,163 @@
+"""Compresses responses with brotli or gzip, whichever the client prefers."""
+
+import zlib
+
+from flask import g, request
+from flask_login import current_user
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    "application/atom+xml",
+    "application/javascript",
+    "application/json",
+    "application/rss+xml",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+)
+
+
+class GzipEncoder:
+    """Incremental gzip compression."""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        """Compress `data` and flush it, so it can be decoded on its own."""
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self):
+        """Return the end of the stream."""
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    """Incremental brotli compression."""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data):
+        """Compress `data` and flush it, so it can be decoded on its own."""
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        """Return the end of the stream."""
+        return self._compressor.finish()
+
+
+def compress(encoder, data):
+    """Compress all of `data` with `encoder` in one go."""
+    return encoder.chunk(data) + encoder.finish()
+
+
+def compress_stream(encoder, chunks, chunk_size=4096):
+    """Compress `chunks` as they are produced, flushing every `chunk_size` bytes."""
+    pending, size = [], 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= chunk_size:
+                yield encoder.chunk(b"".join(pending))
+                pending, size = [], 0
+        yield compress(encoder, b"".join(pending))
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def _encoders(config):
+    encoders = {"gzip": lambda: GzipEncoder(config["COMPRESSION_LEVEL"])}
+    if brotli is not None:
+        encoders["br"] = lambda: BrotliEncoder(config["COMPRESSION_BROTLI_QUALITY"])
+    return encoders
+
+
+def _compressible(response, mimetypes):
+    return (
+        response.mimetype in mimetypes
+        and response.status_code == 200
+        and "Content-Encoding" not in response.headers
+        and not response.direct_passthrough
+        and not response.cache_control.no_transform
+    )
+
+
+def _carries_secret(config):
+    # Compressing a secret next to text an attacker can choose leaks the secret
+    # through the compressed size (BREACH), so pages with a CSRF token or rendered for
+    # a logged in user are sent as they are.
+    return (
+        config.get("WTF_CSRF_FIELD_NAME", "csrf_token") in g
+        or current_user.is_authenticated
+    )
+
+
+def _weaken_etag(response):
+    # The compressed bytes differ, so the validator can only be a weak one.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def init_compression(app):
+    """Compress the responses of `app` for clients that accept it."""
+    if not app.config["COMPRESSION_ENABLED"]:
+        return
+
+    encoders = _encoders(app.config)
+    # Brotli first, since it wins whenever the client likes both equally.
+    preference = sorted(encoders, key=lambda name: name != "br")
+    mimetypes = frozenset(app.config["COMPRESSION_MIMETYPES"])
+    min_size = app.config["COMPRESSION_MIN_SIZE"]
+    chunk_size = app.config["COMPRESSION_STREAM_CHUNK_SIZE"]
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code == 304 and not response.direct_passthrough:
+            # The 200 being revalidated may have been compressed, so send what it had.
+            response.vary.add("Accept-Encoding")
+            if request.accept_encodings.best_match(
+                preference
+            ) is not None and not _carries_secret(app.config):
+                _weaken_etag(response)
+            return response
+        if not _compressible(response, mimetypes):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        name = request.accept_encodings.best_match(preference)
+        if name is None or _carries_secret(app.config):
+            return response
+
+        encoder = encoders[name]()
+        if response.is_streamed:
+            # A HEAD body is never sent, so only its headers have to match GET's.
+            if request.method != "HEAD":
+                response.response = compress_stream(
+                    encoder, response.response, chunk_size
+                )
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(compress(encoder, data))
+
+        response.content_encoding = name
+        _weaken_etag(response)
+        return response
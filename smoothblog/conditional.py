@@ -0,0 +1,67 @@
+"""Conditional GET support so unchanged pages can be answered with a 304."""
+
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+
+def _etag(version):
+    # The page also depends on who is viewing it and which page of it they asked for.
+    basis = f"{version}|{current_user.get_id()}|{request.full_path}"
+    return hashlib.sha1(basis.encode()).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+
+    return False
+
+
+def conditional(validators):
+    """Decorator that answers conditional GETs before the view runs.
+
+    `validators` is called first and returns a `(version, last_modified)` pair that
+    must change whenever the page would. The ETag is derived from the version, and
+    when the client's copy is still current a 304 is returned without running the
+    decorated view at all.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if "_flashes" in session:
+                # Flash messages are shown once, so this page must not be reused.
+                return view(*args, **kwargs)
+
+            version, last_modified = validators(*args, **kwargs)
+            if last_modified is not None:
+                last_modified = last_modified.replace(
+                    tzinfo=timezone.utc, microsecond=0
+                )
+            etag = _etag(version)
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                # Werkzeug would fill in the current time for `None`.
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            response.vary.add("Cookie")
+            return response
+
+        return wrapper
+
+    return decorator
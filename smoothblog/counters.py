@@ -0,0 +1,36 @@
+"""Per user post counters, stored on the user so pages never have to count blogs."""
+
+from sqlalchemy import text
+
+from .database import db
+from .models import Blog, User
+
+_RECONCILE = text("""
+    UPDATE user SET
+        post_count = (SELECT count(*) FROM blog WHERE blog.user_id = user.id),
+        last_posted_at = (SELECT max(date) FROM blog WHERE blog.user_id = user.id)
+    WHERE post_count IS NOT (SELECT count(*) FROM blog WHERE blog.user_id = user.id)
+       OR last_posted_at IS NOT (SELECT max(date) FROM blog WHERE blog.user_id = user.id)
+    """)
+
+
+def adjust_post_counters(user_id, delta):
+    """Add `delta` to a user's post count and refresh their last post date.
+
+    Call it after flushing the change to their blogs and before committing.
+    """
+    db.session.execute(
+        db.update(User)
+        .where(User.id == user_id)
+        .values(
+            post_count=User.post_count + delta,
+            last_posted_at=db.select(db.func.max(Blog.date))
+            .where(Blog.user_id == user_id)
+            .scalar_subquery(),
+        )
+    )
+
+
+def reconcile_post_counters(connection=None):
+    """Recount every user's posts in one statement; return how many had drifted."""
+    return (connection or db.session).execute(_RECONCILE).rowcount
@@ -1,5 +1,28 @@
 """Creates the global database session."""
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 db = SQLAlchemy()
+
+
+def init_sqlite(app):
+    """Apply the `SQLITE_PRAGMAS` setting to every new SQLite connection of `app`.
+
+    WAL journaling lets readers keep going while a writer commits, and the busy
+    timeout makes concurrent writers wait their turn instead of failing straight away
+    with "database is locked".
+    """
+    pragmas = app.config["SQLITE_PRAGMAS"]
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
@@ -0,0 +1,93 @@
+"""Deletes users and their blogs without holding SQLite's write lock for long."""
+
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from .cache import response_cache
+from .counters import adjust_post_counters
+from .database import db
+from .fragments import forget_posts
+from .login_manager import forget_user
+from .models import Blog, User
+
+
+def init_deletion(app):
+    """Start the background deletion worker of `app` if it is configured to use one."""
+    executor = None
+    if app.config["USER_DELETE_MODE"] == "background":
+        # A single worker, since SQLite only allows one writer at a time anyway.
+        executor = ThreadPoolExecutor(1, thread_name_prefix="user-deletion")
+        atexit.register(executor.shutdown)
+    app.extensions["user_deletion"] = executor
+
+
+def delete_user(user_id, chunk_size):
+    """Delete a user and their blogs, committing every `chunk_size` blogs."""
+    chunk = db.select(Blog.id).where(Blog.user_id == user_id).limit(chunk_size)
+    while True:
+        deleted = (
+            db.session.execute(
+                db.delete(Blog).where(Blog.id.in_(chunk)).returning(Blog.id)
+            )
+            .scalars()
+            .all()
+        )
+        if not deleted:
+            break
+        adjust_post_counters(user_id, -len(deleted))
+        db.session.commit()
+        forget_posts(deleted)
+
+    db.session.execute(db.delete(User).where(User.id == user_id))
+    db.session.commit()
+    forget_user(user_id)
+
+
+def delete_users(user_ids):
+    """Delete every user in `user_ids` along with their blogs."""
+    for user_id in user_ids:
+        delete_user(user_id, current_app.config["USER_DELETE_CHUNK_SIZE"])
+    response_cache.clear()
+
+
+def _delete_in_background(app, user_ids):
+    with app.app_context():
+        try:
+            delete_users(user_ids)
+        except Exception:
+            app.logger.exception("Could not delete users %s", user_ids)
+            raise
+
+
+def schedule_deletion(user_ids):
+    """Flag `user_ids` for deletion, then delete them now or queue them for the worker.
+
+    Returns the worker's future, or `None` once the users have been deleted.
+    """
+    db.session.execute(
+        db.update(User).where(User.id.in_(user_ids)).values(pending_deletion=True)
+    )
+    db.session.commit()
+
+    executor = current_app.extensions["user_deletion"]
+    if executor is None:
+        delete_users(user_ids)
+        return None
+
+    # pylint: disable-next=protected-access
+    app = current_app._get_current_object()
+    return executor.submit(_delete_in_background, app, list(user_ids))
+
+
+def resume_deletions():
+    """Delete the users whose deletion was cut short; return their ids."""
+    pending = (
+        db.session.execute(db.select(User.id).where(User.pending_deletion))
+        .scalars()
+        .all()
+    )
+    if pending:
+        delete_users(pending)
+    return pending
@@ -46,3 +46,11 @@ class CreateBlogForm(FlaskForm):
         "Title", validators=[InputRequired(), Length(max=_get_max_length(Blog.title))]
     )
     content = TextAreaField("Content", validators=[InputRequired()])
+
+
+class DeleteUsersForm(FlaskForm):
+    """Form to delete the users selected on the admin page.
+
+    The selected ids are read from the `user_id` checkboxes; the form itself only
+    carries the CSRF token.
+    """
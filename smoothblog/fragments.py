@@ -0,0 +1,62 @@
+"""Caches the rendered body of each blog for the single post page."""
+
+from flask import current_app, render_template
+
+from .cache import CacheState, LRUCache
+from .database import db
+from .models import Blog, User
+
+# Part of every key; bump it whenever `blog/_post.html` changes.
+POST_FRAGMENT_VERSION = 2
+
+
+def init_post_cache(app):
+    """Create the cache that `post_fragment` reads rendered posts from."""
+    backend = app.config["POST_CACHE_BACKEND"] or LRUCache(
+        app.config["POST_CACHE_SIZE"]
+    )
+    app.extensions["post_cache"] = CacheState(backend, app.config["POST_CACHE_TTL"])
+
+
+def _key(blog_id):
+    return f"{blog_id}:{POST_FRAGMENT_VERSION}"
+
+
+def post_fragment(blog_id):
+    """Return the `title`, `user_id` and rendered `html` of a blog, or `None`."""
+    cache = current_app.extensions["post_cache"]
+    fragment = cache.backend.get(_key(blog_id))
+    cache.count(hit=fragment is not None)
+    if fragment is not None:
+        return fragment
+
+    row = db.session.execute(
+        db.select(
+            Blog.id,
+            Blog.title,
+            Blog.content,
+            Blog.date,
+            Blog.reading_time,
+            Blog.user_id,
+            User.username,
+        )
+        .join(User, User.id == Blog.user_id)
+        .where(Blog.id == blog_id)
+    ).first()
+    if row is None:
+        return None
+
+    fragment = {
+        "title": row.title,
+        "user_id": row.user_id,
+        "html": render_template("blog/_post.html", blog=row),
+    }
+    cache.backend.set(_key(blog_id), fragment, cache.ttl)
+    return fragment
+
+
+def forget_posts(blog_ids):
+    """Drop deleted blogs from the cache; every code path deleting blogs calls it."""
+    backend = current_app.extensions["post_cache"].backend
+    for blog_id in blog_ids:
+        backend.delete(_key(blog_id))
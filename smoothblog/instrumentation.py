@@ -0,0 +1,209 @@
+"""Per request timings, SQL statement counts and a slow query log."""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from flask import (
+    before_render_template,
+    g,
+    has_request_context,
+    request,
+    template_rendered,
+)
+from sqlalchemy import event
+
+from .database import db
+
+slow_query_logger = logging.getLogger("smoothblog.slow_queries")
+
+_FIELDS = ("requests", "seconds", "statements", "sql_seconds", "template_seconds")
+
+
+class RequestTimings:  # pylint: disable=too-few-public-methods
+    """What a single request has spent its time on so far."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_starts = []
+
+    def server_timing(self, total):
+        """Format the timings as a `Server-Timing` header value."""
+        return (
+            f"app;dur={total * 1000:.1f}, "
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.statements} queries", '
+            f"tpl;dur={self.template_seconds * 1000:.1f}"
+        )
+
+
+class Metrics:
+    """Thread safe totals per endpoint, exported in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(lambda: dict.fromkeys(_FIELDS, 0))
+        self._statuses = defaultdict(int)
+        self._slow_queries = defaultdict(int)
+
+    def record(self, endpoint, status, total, timings):
+        """Add a finished request to the totals."""
+        with self._lock:
+            totals = self._endpoints[endpoint]
+            totals["requests"] += 1
+            totals["seconds"] += total
+            totals["statements"] += timings.statements
+            totals["sql_seconds"] += timings.sql_seconds
+            totals["template_seconds"] += timings.template_seconds
+            self._statuses[(endpoint, status)] += 1
+
+    def record_slow_query(self, endpoint):
+        """Count a statement that went over the slow query threshold."""
+        with self._lock:
+            self._slow_queries[endpoint] += 1
+
+    def render(self, counters=None):
+        """Return every total, plus the extra `counters`, in Prometheus text format."""
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP smoothblog_{name} {help_text}")
+            lines.append(f"# TYPE smoothblog_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                if label_text:
+                    label_text = f"{{{label_text}}}"
+                lines.append(f"smoothblog_{name}{label_text} {value}")
+
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            family(
+                "requests_total",
+                "counter",
+                "Requests handled.",
+                [
+                    ((("endpoint", endpoint), ("status", status)), count)
+                    for (endpoint, status), count in sorted(self._statuses.items())
+                ],
+            )
+            for field, name, help_text in (
+                ("seconds", "request_seconds_total", "Wall time spent on requests."),
+                ("statements", "sql_statements_total", "SQL statements executed."),
+                ("sql_seconds", "sql_seconds_total", "Time spent executing SQL."),
+                (
+                    "template_seconds",
+                    "template_seconds_total",
+                    "Time spent rendering templates.",
+                ),
+            ):
+                family(
+                    name,
+                    "counter",
+                    help_text,
+                    [
+                        ((("endpoint", endpoint),), totals[field])
+                        for endpoint, totals in endpoints
+                    ],
+                )
+            family(
+                "slow_queries_total",
+                "counter",
+                "SQL statements slower than the slow query threshold.",
+                [
+                    ((("endpoint", endpoint),), count)
+                    for endpoint, count in sorted(self._slow_queries.items())
+                ],
+            )
+
+        for name, (help_text, value) in sorted((counters or {}).items()):
+            family(name, "counter", help_text, [((), value)])
+
+        return "\n".join(lines) + "\n"
+
+
+def _current_timings():
+    return g.get("timings") if has_request_context() else None
+
+
+def _endpoint():
+    if not has_request_context():
+        return "cli"
+    return request.endpoint or "unknown"
+
+
+def init_instrumentation(app):
+    """Start timing the requests and SQL statements of `app`."""
+    metrics = Metrics()
+    app.extensions["metrics"] = metrics
+    with app.app_context():
+        engine = db.engine
+
+    # The start time lives on the execution context, so a statement that raises
+    # leaves nothing behind on the pooled connection.
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement(_conn, _cursor, _statement, _parameters, context, _many):
+        context.statement_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finish_statement(_conn, _cursor, statement, _parameters, context, _many):
+        duration = time.perf_counter() - context.statement_start
+
+        timings = _current_timings()
+        if timings is not None:
+            timings.statements += 1
+            timings.sql_seconds += duration
+
+        if duration * 1000 >= app.config["SLOW_QUERY_THRESHOLD_MS"]:
+            endpoint = _endpoint()
+            metrics.record_slow_query(endpoint)
+            slow_query_logger.warning(
+                "%.1fms in %s: %s",
+                duration * 1000,
+                endpoint,
+                " ".join(statement.split()),
+            )
+
+    def start_template(*_, **__):
+        timings = _current_timings()
+        if timings is not None:
+            timings.template_starts.append(time.perf_counter())
+
+    def finish_template(*_, **__):
+        timings = _current_timings()
+        if timings is not None and timings.template_starts:
+            timings.template_seconds += (
+                time.perf_counter() - timings.template_starts.pop()
+            )
+
+    before_render_template.connect(start_template, app, weak=False)
+    template_rendered.connect(finish_template, app, weak=False)
+
+    @app.before_request
+    def start_request():
+        g.timings = RequestTimings()
+
+    @app.after_request
+    def finish_request(response):
+        timings = _current_timings()
+        if timings is None:
+            return response
+
+        endpoint, status = _endpoint(), response.status_code
+        if response.is_streamed:
+            # The body, with most of the queries and the template, is only produced
+            # after this hook, too late for a header; record it all once it is sent.
+            response.call_on_close(
+                lambda: metrics.record(
+                    endpoint, status, time.perf_counter() - timings.start, timings
+                )
+            )
+            return response
+
+        total = time.perf_counter() - timings.start
+        metrics.record(endpoint, status, total, timings)
+        if app.config["SERVER_TIMING"]:
+            response.headers["Server-Timing"] = timings.server_timing(total)
+        return response
@@ -2,19 +2,72 @@
 
 from functools import wraps
 
-from flask import flash, redirect, url_for
-from flask_login import LoginManager, current_user
+from flask import current_app, flash, redirect, url_for
+from flask_login import LoginManager, UserMixin, current_user
 
+from .cache import CacheState, LRUCache
+from .database import db
 from .models import User
 
 lm = LoginManager()
 
 
+class CachedUser(UserMixin):
+    """The identity of a logged in user, without a database session behind it."""
+
+    def __init__(self, id_, username, email, is_admin):
+        self.id = id_  # pylint: disable=invalid-name
+        self.username = username
+        self.email = email
+        self.is_admin = is_admin
+
+    def __repr__(self):
+        return rf"<User {self.email}>"
+
+
+def init_user_cache(app):
+    """Create the process level cache `load_user` reads identities from."""
+    backend = app.config["USER_CACHE_BACKEND"] or LRUCache(
+        app.config["USER_CACHE_SIZE"]
+    )
+    app.extensions["user_cache"] = CacheState(backend, app.config["USER_CACHE_TTL"])
+
+
+def forget_user(user_id):
+    """Drop a user from the cache, e.g. once they have been deleted."""
+    current_app.extensions["user_cache"].backend.delete(str(user_id))
+
+
 @lm.user_loader
 def load_user(id_):
-    """Callback used to reload the user object from the session."""
+    """Callback used to reload the user object from the session.
+
+    Flask-Login already keeps the result for the rest of the request. Across requests
+    identities are cached for `USER_CACHE_TTL` seconds, so most page views by a logged
+    in user skip the primary key lookup.
+    """
+    cache = current_app.extensions["user_cache"]
+    identity = cache.backend.get(id_)
+    cache.count(hit=identity is not None)
+
+    if identity is None:
+        try:
+            user_id = int(id_)
+        except ValueError:
+            return None
+
+        row = db.session.execute(
+            db.select(User.id, User.username, User.email, User.is_admin).where(
+                User.id == user_id
+            )
+        ).first()
+        if row is None:
+            return None
+
+        identity = tuple(row)
+        cache.backend.set(id_, identity, cache.ttl)
 
-    return User.query.get(id_)
+    return CachedUser(*identity)
 
 
 def logout_required(func):
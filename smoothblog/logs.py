@@ -0,0 +1,107 @@
+"""Keeps log file writes off the request thread."""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+_listeners = []
+_handlers = []
+_traceback_formatter = logging.Formatter()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when its queue is full."""
+
+    def __init__(self, log_queue, policy="drop", timeout=0.05):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.timeout = timeout
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            if self.policy == "block":
+                self.queue.put(record, timeout=self.timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        """Merge the arguments into the message, keeping the traceback in `exc_text`.
+
+        The base class formats the traceback into the message, which would leave
+        `JsonFormatter` nothing to put in its "exception" field.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DrainingQueueListener(QueueListener):
+    """Queue listener that waits for room in a full queue when it is stopped."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single line JSON object."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry)
+
+
+def queue_handlers(logger, size=10000, policy="drop", keep=()):
+    """Move the handlers of `logger` behind a bounded queue and return its listener.
+
+    Handlers named in `keep` stay on the logging thread.
+    """
+    handlers = [handler for handler in logger.handlers if handler.name not in keep]
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    log_queue = queue.Queue(size)
+    listener = DrainingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    queue_handler = BoundedQueueHandler(log_queue, policy)
+    logger.addHandler(queue_handler)
+
+    _listeners.append(listener)
+    _handlers.append(queue_handler)
+    return listener
+
+
+def dropped_records():
+    """How many records the queues have dropped since logging was last set up."""
+    return sum(handler.dropped for handler in _handlers)
+
+
+def stop_listeners():
+    """Flush every queued record and stop the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
+    _handlers.clear()
+
+
+atexit.register(stop_listeners)
@@ -0,0 +1,151 @@
+"""Versioned schema migrations for databases created by older releases."""
+
+from . import search, versions
+from .counters import reconcile_post_counters
+from .database import db
+
+MIGRATIONS = []
+
+
+def migration(func):
+    """Register `func` as the next migration; it receives an open connection."""
+    MIGRATIONS.append(func)
+    return func
+
+
+def head():
+    """Version of the schema described by the models."""
+    return len(MIGRATIONS)
+
+
+def current_version(connection):
+    """Version the connected database has been migrated to."""
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def stamp(version=None):
+    """Mark the database as being at `version`, the latest one by default."""
+    version = head() if version is None else version
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def upgrade():
+    """Apply every pending migration and return the names of those applied."""
+    applied = []
+    # pysqlite does not wrap DDL in transactions on its own, so manage them by hand.
+    with db.engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        for version, step in enumerate(MIGRATIONS, start=1):
+            if version <= current_version(connection):
+                continue
+
+            connection.exec_driver_sql("BEGIN")
+            try:
+                step(connection)
+                connection.exec_driver_sql(f"PRAGMA user_version = {version}")
+            except Exception:
+                connection.exec_driver_sql("ROLLBACK")
+                raise
+            connection.exec_driver_sql("COMMIT")
+            applied.append(step.__name__)
+
+    return applied
+
+
+def _add_column(connection, table, definition):
+    # SQLite has no ADD COLUMN IF NOT EXISTS.
+    columns = {
+        row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")
+    }
+    if definition.split()[0] not in columns:
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+
+@migration
+def add_listing_indexes(connection):
+    """Index blogs for the newest-first feed and for per-user lookups."""
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_blog_date_id ON blog (date, id)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_blog_user_id_date_id ON blog (user_id, date, id)"
+    )
+
+
+@migration
+def add_search_index(connection):
+    """Create the full text search index and fill it from existing blogs."""
+    search.create_index(connection)
+    search.rebuild_index(connection)
+
+
+@migration
+def cascade_blog_deletes(connection):
+    """Delete a user's blogs along with them, by rebuilding blog with ON DELETE CASCADE.
+
+    SQLite cannot change a foreign key in place. Blogs left behind by users deleted
+    earlier are removed first, as the cascade would have done.
+    """
+    connection.exec_driver_sql(
+        "DELETE FROM blog WHERE user_id NOT IN (SELECT id FROM user)"
+    )
+    connection.exec_driver_sql("""
+        CREATE TABLE blog_new (
+            id INTEGER NOT NULL,
+            title VARCHAR(500) NOT NULL,
+            content TEXT NOT NULL,
+            date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            user_id INTEGER,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES user (id) ON DELETE CASCADE
+        )
+        """)
+    connection.exec_driver_sql(
+        "INSERT INTO blog_new (id, title, content, date, user_id) "
+        "SELECT id, title, content, date, user_id FROM blog"
+    )
+    # Dropping blog also drops its indexes and search triggers, but keeps the search
+    # index itself, which stays valid since every id is kept.
+    connection.exec_driver_sql("DROP TABLE blog")
+    connection.exec_driver_sql("ALTER TABLE blog_new RENAME TO blog")
+    add_listing_indexes(connection)
+    search.create_index(connection)
+
+
+@migration
+def add_blog_excerpts(connection):
+    """Add the excerpt columns; `flask backfill-excerpts` fills them for old blogs."""
+    for column in ("excerpt TEXT", "word_count INTEGER", "reading_time INTEGER"):
+        _add_column(connection, "blog", column)
+
+
+@migration
+def add_user_post_counters(connection):
+    """Add each user's post count and last post date, and fill them in."""
+    _add_column(connection, "user", "post_count INTEGER NOT NULL DEFAULT 0")
+    _add_column(connection, "user", "last_posted_at DATETIME")
+    reconcile_post_counters(connection)
+
+
+@migration
+def add_user_pending_deletion(connection):
+    """Add the flag marking users whose deletion has been scheduled."""
+    _add_column(connection, "user", "pending_deletion BOOLEAN NOT NULL DEFAULT 0")
+
+
+@migration
+def add_content_version(connection):
+    """Add the content version and the triggers that bump it."""
+    versions.create_version(connection)
+
+
+@migration
+def add_record_version(connection):
+    """Add the version that only moves when cached blogs or identities go stale."""
+    _add_column(
+        connection, "content_version", "record_version INTEGER NOT NULL DEFAULT 0"
+    )
+    versions.drop_triggers(connection)
+    versions.create_version(connection)
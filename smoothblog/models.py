@@ -1,10 +1,43 @@
 """Models used to represent database tables."""
 
+import math
+
 from flask_login import UserMixin
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
-from werkzeug.security import generate_password_hash
 
 from .database import db
+from .passwords import hash_password
+
+# SQLite compares datetimes as text, so store them in the same format as
+# `CURRENT_TIMESTAMP` to keep keyset pagination comparisons consistent.
+Timestamp = db.DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d "
+        "%(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+EXCERPT_WORDS = 60
+WORDS_PER_MINUTE = 200
+
+# The search index marks matches with these, so they are kept out of stored text.
+_SEARCH_MARKS = dict.fromkeys(map(ord, "\x02\x03"))
+
+
+def clean_text(text):
+    """Drop the control characters the search index uses to mark matches."""
+    return text.translate(_SEARCH_MARKS)
+
+
+def summarize(content):
+    """Return the `(excerpt, word_count, reading_time)` stored alongside `content`."""
+    words = content.split()
+    excerpt = " ".join(words[:EXCERPT_WORDS])
+    if len(words) > EXCERPT_WORDS:
+        excerpt += " …"
+    return excerpt, len(words), max(1, math.ceil(len(words) / WORDS_PER_MINUTE))
 
 
 class User(db.Model, UserMixin):
@@ -14,17 +47,25 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(320), unique=True, nullable=False)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(
-        # 102 is the length returned from `generate_password_hash`
-        db.String(102),
+        # Long enough for every `PASSWORD_HASH_METHOD`, e.g. 162 for scrypt
+        db.String(255),
         nullable=False,
     )
-    blogs = db.relationship("Blog", back_populates="user")
+    # The database deletes a user's blogs along with them, see `Blog.user_id`.
+    blogs = db.relationship("Blog", back_populates="user", passive_deletes=True)
     is_admin = db.Column(db.Boolean, default=False)
+    # Maintained by `counters.adjust_post_counters`, so nothing has to count blogs.
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    last_posted_at = db.Column(Timestamp)
+    # Set until `deletion.delete_user` is done, so an interrupted deletion can resume.
+    pending_deletion = db.Column(
+        db.Boolean, nullable=False, default=False, server_default="0"
+    )
 
     def __init__(self, email, username, password_str, is_admin=False):
         self.email = email
         self.username = username
-        self.password = generate_password_hash(password_str)
+        self.password = hash_password(password_str)
         self.is_admin = is_admin
 
     def __repr__(self):
@@ -34,16 +75,28 @@ class User(db.Model, UserMixin):
 class Blog(db.Model):
     """The Blog model relates to the blog table."""
 
+    # Keep in step with `migrations.add_listing_indexes`.
+    __table_args__ = (
+        db.Index("ix_blog_date_id", "date", "id"),
+        db.Index("ix_blog_user_id_date_id", "user_id", "date", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(500), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    date = db.Column(db.DateTime, server_default=func.now())
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    # Kept in step with `content` so listings never need to load it, see `summarize`.
+    excerpt = db.Column(db.Text)
+    word_count = db.Column(db.Integer)
+    reading_time = db.Column(db.Integer)
+    date = db.Column(Timestamp, server_default=func.now())
+    # Keep in step with `migrations.cascade_blog_deletes`.
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"))
     user = db.relationship("User")
 
     def __init__(self, title, content, user_id):
-        self.title = title
-        self.content = content
+        self.title = clean_text(title)
+        self.content = content = clean_text(content)
+        self.excerpt, self.word_count, self.reading_time = summarize(content)
         self.user_id = user_id
 
     def __repr__(self):
@@ -0,0 +1,172 @@
+"""Keyset (cursor) pagination used by the listing pages."""
+
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import DateTime, literal, tuple_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor from the query string cannot be decoded."""
+
+
+# Offset pages past this are refused rather than sent to SQLite, whose integers
+# would overflow for absurd page numbers.
+MAX_PAGE = 10000
+
+
+def page_number(args):
+    """The 1-based `page` asked for in `args`, or `None` when it is past `MAX_PAGE`."""
+    page = args.get("page", 1, type=int)
+    return None if page > MAX_PAGE else max(page, 1)
+
+
+# One page of rows plus the cursors needed to reach its neighbours.
+Page = namedtuple(
+    "Page", ["items", "next_cursor", "prev_cursor"], defaults=(None, None)
+)
+
+
+def encode_cursor(values):
+    """Encode the sort key values of a row into an opaque, URL safe cursor."""
+    raw = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, keys):
+    """Decode a cursor back into values comparable with `keys`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise InvalidCursor(cursor)
+
+        return [
+            datetime.fromisoformat(value) if isinstance(key.type, DateTime) else value
+            for key, value in zip(keys, values)
+        ]
+    except (binascii.Error, TypeError, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _bound(keys, cursor):
+    # Bind with each key's own type so values are stored the same way as the column.
+    values = decode_cursor(cursor, keys)
+    return tuple_(*(literal(value, key.type) for key, value in zip(keys, values)))
+
+
+def row_cursor(row, keys):
+    """Build the cursor that points at `row`."""
+    return encode_cursor([getattr(row, key.key) for key in keys])
+
+
+class StreamedPage:
+    """A page of rows that are only read from `rows` while they are iterated over.
+
+    `rows` may hold one row more than `page_size`, which tells there is a next page.
+    `has_next` and the cursors are only known once the page has been iterated over,
+    so templates must render their pager after the rows.
+    """
+
+    def __init__(self, rows, page_size, keys=None, has_prev=False):
+        self._rows = rows
+        self._page_size = page_size
+        self._keys = keys
+        self._first = self._last = None
+        self.has_prev = has_prev
+        self.has_next = False
+
+    @property
+    def items(self):
+        """The page itself, so it can stand in for a `Page`."""
+        return self
+
+    def __iter__(self):
+        rows = iter(self._rows)
+        try:
+            for count, row in enumerate(rows):
+                if count == self._page_size:
+                    self.has_next = True
+                    break
+                if self._first is None:
+                    self._first = row
+                self._last = row
+                yield row
+        finally:
+            # Stopping after the extra row must not leave the cursor open.
+            for source in (rows, self._rows):
+                if hasattr(source, "close"):
+                    source.close()
+
+    def _cursor(self, row, wanted):
+        if not wanted or row is None or self._keys is None:
+            return None
+        return row_cursor(row, self._keys)
+
+    @property
+    def next_cursor(self):
+        """Cursor of the next page, once every row has been read."""
+        return self._cursor(self._last, self.has_next)
+
+    @property
+    def prev_cursor(self):
+        """Cursor of the previous page, once the first row has been read."""
+        return self._cursor(self._first, self.has_prev)
+
+
+def keyset_paginate(  # pylint: disable=too-many-arguments
+    query, keys, page_size, after=None, before=None, *, yield_per=None
+):
+    """Return a `Page` of `query` ordered by `keys`, newest first.
+
+    `keys` must be unique together (end them with the primary key) so ordering is
+    stable even while new rows are inserted. `after` continues past the last row of
+    the previous page and `before` walks back toward the newest rows. Each call
+    reads at most `page_size + 1` rows no matter how large the table is.
+
+    With `yield_per`, pages that run newest first are returned as a `StreamedPage`
+    that fetches that many rows at a time as it is rendered. Pages walking back with
+    `before` have to be reversed, so they are always read in full.
+    """
+    key = tuple_(*keys)
+    if before:
+        query = query.filter(key > _bound(keys, before))
+        query = query.order_by(*(k.asc() for k in keys))
+    else:
+        if after:
+            query = query.filter(key < _bound(keys, after))
+        query = query.order_by(*(k.desc() for k in keys))
+        if yield_per:
+            return StreamedPage(
+                query.limit(page_size + 1).yield_per(yield_per),
+                page_size,
+                keys,
+                has_prev=bool(after),
+            )
+
+    rows = query.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before:
+        rows.reverse()
+
+    if not rows:
+        return Page(rows)
+
+    has_next = bool(before) or has_more
+    has_prev = has_more if before else bool(after)
+
+    return Page(
+        rows,
+        next_cursor=row_cursor(rows[-1], keys) if has_next else None,
+        prev_cursor=row_cursor(rows[0], keys) if has_prev else None,
+    )
@@ -0,0 +1,88 @@
+"""Password hashing with a configurable cost that can run outside the request thread."""
+
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class HashingBusy(Exception):
+    """Raised when every hashing slot stayed taken for the whole timeout."""
+
+
+class HashingPool:
+    """A process pool for hashing plus a limit on how many jobs may be in flight."""
+
+    def __init__(self, workers, concurrency, timeout):
+        # Spawn rather than fork, since the app already runs threads of its own.
+        self.executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.timeout = timeout
+        atexit.register(self.executor.shutdown)
+
+    def run(self, func, *args):
+        """Run `func(*args)` in the pool and wait for its result."""
+        # pylint: disable-next=consider-using-with
+        if not self.slots.acquire(timeout=self.timeout):
+            raise HashingBusy()
+        try:
+            return self.executor.submit(func, *args).result()
+        finally:
+            self.slots.release()
+
+
+def init_passwords(app):
+    """Create the hashing pool of `app` if it is configured to use one."""
+    workers = app.config["PASSWORD_HASH_WORKERS"]
+    app.extensions["password_pool"] = (
+        HashingPool(
+            workers,
+            app.config["PASSWORD_HASH_CONCURRENCY"],
+            app.config["PASSWORD_HASH_TIMEOUT"],
+        )
+        if workers
+        else None
+    )
+
+
+def _method():
+    if has_app_context():
+        return current_app.config["PASSWORD_HASH_METHOD"]
+    return DEFAULT_METHOD
+
+
+def _run(func, *args):
+    pool = current_app.extensions["password_pool"] if has_app_context() else None
+    if pool is None:
+        return func(*args)
+    return pool.run(func, *args)
+
+
+@lru_cache
+def _prefix(method):
+    # werkzeug fills in defaults (e.g. "pbkdf2" becomes "pbkdf2:sha256:600000"), so
+    # ask it what the stored prefix of a hash made with `method` looks like.
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+def hash_password(password):
+    """Hash `password` with the configured method."""
+    return _run(generate_password_hash, password, _method())
+
+
+def verify_password(pwhash, password):
+    """Check `password` against a stored hash."""
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """Whether `pwhash` was made with a different method than the configured one."""
+    return pwhash.split("$", 1)[0] != _prefix(_method())
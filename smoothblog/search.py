@@ -0,0 +1,149 @@
+"""Full text search over blogs, backed by an SQLite FTS5 index."""
+
+import re
+from contextlib import contextmanager
+
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, event, text
+
+from .database import db
+from .models import Blog
+
+# Blogs are stored without these control characters (see `models.clean_text`), so
+# they safely mark matches until the snippet has been escaped.
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+# An external content table indexing the blog table without a second copy of it.
+# Triggers keep it in step with every write, including bulk ones bypassing the ORM.
+SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_fts USING fts5("
+    "title, content, content='blog', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_insert AFTER INSERT ON blog BEGIN "
+    "INSERT INTO blog_fts (rowid, title, content) "
+    "VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_delete AFTER DELETE ON blog BEGIN "
+    "INSERT INTO blog_fts (blog_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_update AFTER UPDATE OF title, content "
+    "ON blog BEGIN "
+    "INSERT INTO blog_fts (blog_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO blog_fts (rowid, title, content) "
+    "VALUES (new.id, new.title, new.content); END",
+]
+
+TRIGGERS = ("blog_fts_insert", "blog_fts_delete", "blog_fts_update")
+
+for _statement in SCHEMA:
+    event.listen(Blog.__table__, "after_create", DDL(_statement))
+event.listen(Blog.__table__, "before_drop", DDL("DROP TABLE IF EXISTS blog_fts"))
+
+_SEARCH = text(f"""
+    SELECT blog.id, blog.date, user.username, user.email,
+           highlight(blog_fts, 0, '{_MARK_START}', '{_MARK_END}') AS title,
+           snippet(blog_fts, 1, '{_MARK_START}', '{_MARK_END}', '…', 32) AS snippet
+    FROM blog_fts
+    JOIN blog ON blog.id = blog_fts.rowid
+    JOIN user ON user.id = blog.user_id
+    WHERE blog_fts MATCH :query
+    ORDER BY bm25(blog_fts, 5.0, 1.0), blog.id DESC
+    LIMIT :limit OFFSET :offset
+    """).columns(date=Blog.date.type)
+
+
+def create_index(connection):
+    """Create the search index and its triggers if they do not exist yet."""
+    for statement in SCHEMA:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_index(connection):
+    """Rebuild the whole search index from the blog table in one pass."""
+    connection.exec_driver_sql("INSERT INTO blog_fts (blog_fts) VALUES ('rebuild')")
+
+
+def repair_index(connection):
+    """Recreate missing search triggers and rebuild the index; return whether it had to.
+
+    A bulk load that was killed before it finished leaves the insert trigger dropped,
+    after which new blogs would silently stop being indexed.
+    """
+    names = set(
+        connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        ).scalars()
+    )
+    if "blog_fts" not in names or all(name in names for name in TRIGGERS):
+        return False
+
+    create_index(connection)
+    rebuild_index(connection)
+    return True
+
+
+def init_search(app):
+    """Repair the search index of `app` if a bulk load was interrupted."""
+    with app.app_context(), db.engine.begin() as connection:
+        if repair_index(connection):
+            app.logger.warning(
+                "Recreated missing search triggers and rebuilt the index."
+            )
+
+
+@contextmanager
+def bulk_indexing():
+    """Index blogs inserted inside the block in one pass at the end.
+
+    The per row insert trigger is suspended meanwhile, which makes bulk loads much
+    faster. Only use it while nothing else is writing blogs. If the process dies
+    before the end, `init_search` restores the trigger and the index at the next start.
+    """
+    first_id = (db.session.execute(db.select(db.func.max(Blog.id))).scalar() or 0) + 1
+    db.session.execute(text("DROP TRIGGER IF EXISTS blog_fts_insert"))
+    db.session.commit()
+    try:
+        yield
+    finally:
+        # The block may have failed part way through a transaction.
+        db.session.rollback()
+        db.session.execute(
+            text(
+                "INSERT INTO blog_fts (rowid, title, content) "
+                "SELECT id, title, content FROM blog WHERE id >= :first_id"
+            ),
+            {"first_id": first_id},
+        )
+        db.session.execute(text(SCHEMA[1]))
+        db.session.commit()
+
+
+def match_query(terms):
+    """Turn free text into an FTS5 query that matches posts containing every word.
+
+    Each word is quoted so characters with a meaning in the FTS5 query syntax are
+    searched for literally instead of raising a syntax error.
+    """
+    words = re.findall(r"\w+", terms)
+    return " ".join(f'"{word}"' for word in words)
+
+
+def highlight(fragment):
+    """Escape a fragment returned by the index and wrap its matches in `<mark>`."""
+    escaped = str(escape(fragment))
+    return Markup(escaped.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>"))
+
+
+def search(terms, page, per_page):
+    """Return the best matches for `terms` on `page`, and whether more follow."""
+    query = match_query(terms)
+    if not query:
+        return [], False
+
+    rows = db.session.execute(
+        _SEARCH,
+        {"query": query, "limit": per_page + 1, "offset": (page - 1) * per_page},
+    ).all()
+
+    return rows[:per_page], len(rows) > per_page
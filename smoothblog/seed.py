@@ -0,0 +1,129 @@
+"""Generates synthetic users and blogs so production sized data can be used locally."""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+from .counters import reconcile_post_counters
+from .database import db
+from .models import Blog, User, summarize
+from .passwords import hash_password
+from .search import bulk_indexing
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure "
+    "in reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint "
+    "occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est "
+    "laborum flask python blog smooth coffee weekend travel recipe garden music film "
+    "book review design code database cache server cloud mountain river city night"
+).split()
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choices(WORDS, k=words)).capitalize() + "."
+
+
+def _content(rng):
+    # Post lengths are roughly log-normal: most are a few hundred words, a few are
+    # long essays.
+    words = min(int(rng.lognormvariate(5.3, 0.8)) + 5, 20000)
+    paragraphs = []
+    while words > 0:
+        length = min(rng.randint(40, 120), words)
+        paragraphs.append(_sentence(rng, length))
+        words -= length
+    return "\n\n".join(paragraphs)
+
+
+def _blog_row(rng, date, user_id):
+    content = _content(rng)
+    excerpt, word_count, reading_time = summarize(content)
+    return {
+        "title": _sentence(rng, rng.randint(3, 12))[:-1],
+        "content": content,
+        "excerpt": excerpt,
+        "word_count": word_count,
+        "reading_time": reading_time,
+        "date": date,
+        "user_id": user_id,
+    }
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(table, rows, batch_size):
+    # Core executemany inserts, one transaction per batch.
+    for batch in _batches(rows, batch_size):
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+
+
+def seed(  # pylint: disable=too-many-arguments
+    users,
+    blogs,
+    *,
+    batch_size=5000,
+    password="password",
+    password_hash=None,
+    rng=None,
+):
+    """Insert `users` new users and `blogs` new blogs spread among them.
+
+    Every user shares one password hash, computed once from `password` unless
+    `password_hash` is given, so no time is spent hashing per user. Blog dates are
+    spread over the last three years in insertion order, and a few prolific authors
+    write most of the posts. New blogs are added to the search index and the authors'
+    post counters are brought up to date, each in one pass at the end.
+    """
+    rng = rng or random.Random()
+    password_hash = password_hash or hash_password(password)
+
+    first_id = (db.session.execute(db.select(db.func.max(User.id))).scalar() or 0) + 1
+    user_ids = list(range(first_id, first_id + users))
+    _insert(
+        User.__table__,
+        (
+            {
+                "id": user_id,
+                "email": f"user{user_id}@example.com",
+                "username": f"user{user_id}",
+                "password": password_hash,
+                "is_admin": False,
+            }
+            for user_id in user_ids
+        ),
+        batch_size,
+    )
+
+    if not user_ids:
+        user_ids = db.session.execute(db.select(User.id)).scalars().all()
+    if blogs and not user_ids:
+        raise ValueError("Blogs need at least one user to write them.")
+
+    span = timedelta(days=3 * 365)
+    start = datetime.now(timezone.utc).replace(tzinfo=None) - span
+    with bulk_indexing():
+        _insert(
+            Blog.__table__,
+            (
+                _blog_row(
+                    rng,
+                    start + span * (i / max(blogs, 1)),
+                    user_ids[int(len(user_ids) * rng.random() ** 3)],
+                )
+                for i in range(blogs)
+            ),
+            batch_size,
+        )
+    reconcile_post_counters()
+    db.session.commit()
@@ -1,4 +1,4 @@
-const form = document.querySelector("form");
+const form = document.querySelector("main form");
 
 form.addEventListener("submit", (e) => {
   if (!form.checkValidity()) {
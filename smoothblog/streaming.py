@@ -0,0 +1,21 @@
+"""Streams listing pages while their rows are still being read from the database."""
+
+from flask import current_app, get_flashed_messages, render_template, stream_template
+
+
+def listing_batch_size():
+    """How many rows a listing fetches at a time, or `None` to read them all at once."""
+    if current_app.config["STREAM_LISTINGS"]:
+        return current_app.config["STREAM_LISTINGS_BATCH_SIZE"]
+    return None
+
+
+def render_listing(template, **context):
+    """Render a listing page, streaming it when `STREAM_LISTINGS` is on."""
+    if not current_app.config["STREAM_LISTINGS"]:
+        return render_template(template, **context)
+
+    # The session is saved before the body is generated, so take the flashed
+    # messages out of it now; the template then reads them from the request.
+    get_flashed_messages()
+    return stream_template(template, **context)
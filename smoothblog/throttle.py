@@ -0,0 +1,157 @@
+"""Token bucket throttling of login attempts."""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class BucketStore:
+    """Interface shared by every token bucket store."""
+
+    def take(self, buckets):
+        """Take a token from each of `buckets`, given as `(key, per_minute, burst)`.
+
+        Tokens are only taken when every bucket has one, so a rejected attempt costs
+        nothing. Return the seconds each bucket needs until it has a token, all 0 if
+        the tokens were taken.
+        """
+        raise NotImplementedError
+
+
+class MemoryBuckets(BucketStore):
+    """Thread safe buckets of a single process, forgetting the least recently used."""
+
+    def __init__(self, maxsize=10000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        with self._lock:
+            now = self._clock()
+            levels, waits = [], []
+            for key, per_minute, burst in buckets:
+                rate = per_minute / 60
+                tokens, updated = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated) * rate)
+                levels.append(tokens)
+                waits.append(0 if tokens >= 1 else (1 - tokens) / rate)
+
+            spend = not any(waits)
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - 1 if spend else tokens, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return waits
+
+
+class RedisBuckets(BucketStore):
+    """Buckets shared between workers, updated atomically by a Redis Lua script."""
+
+    SCRIPT = """
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local levels, waits, spend = {}, {}, true
+    for i, key in ipairs(KEYS) do
+        local rate = tonumber(ARGV[2 * i - 1]) / 60
+        local burst = tonumber(ARGV[2 * i])
+        local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+        local tokens = tonumber(bucket[1]) or burst
+        local updated = tonumber(bucket[2]) or now
+        levels[i] = math.min(burst, tokens + (now - updated) * rate)
+        waits[i] = 0
+        if levels[i] < 1 then
+            waits[i] = (1 - levels[i]) / rate
+            spend = false
+        end
+    end
+    for i, key in ipairs(KEYS) do
+        local rate = tonumber(ARGV[2 * i - 1]) / 60
+        local burst = tonumber(ARGV[2 * i])
+        if spend then
+            levels[i] = levels[i] - 1
+        end
+        redis.call(
+            'HSET', key, 'tokens', tostring(levels[i]), 'updated', tostring(now)
+        )
+        redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+        waits[i] = tostring(waits[i])
+    end
+    return waits
+    """
+
+    def __init__(self, client, prefix="smoothblog:throttle"):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, buckets):
+        keys = [f"{self.prefix}:{key}" for key, _, _ in buckets]
+        limits = [
+            limit for _, per_minute, burst in buckets for limit in (per_minute, burst)
+        ]
+        waits = self.client.eval(self.SCRIPT, len(keys), *keys, *limits)
+        return [float(wait) for wait in waits]
+
+
+class LoginThrottle:
+    """A bucket store together with the limits and counters of an app."""
+
+    def __init__(self, store, limits):
+        self.store = store
+        self.limits = limits
+        self.counts = dict.fromkeys(("allowed", *limits), 0)
+        self.lock = threading.Lock()
+
+    def check(self, ip, email):
+        """Return 0 if the attempt may go ahead, otherwise the seconds to wait."""
+        kinds = (("ip", ip), ("email", email.strip().lower()))
+        waits = self.store.take(
+            [(f"{kind}:{value}", *self.limits[kind]) for kind, value in kinds]
+        )
+        for (kind, _), wait in zip(kinds, waits):
+            if wait:
+                self._count(kind)
+                return max(waits)
+
+        self._count("allowed")
+        return 0
+
+    def _count(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def stats(self):
+        """Allowed attempts and attempts limited by each kind of bucket."""
+        return dict(self.counts)
+
+
+def init_login_throttle(app):
+    """Create the login throttle of `app`."""
+    store = app.config["LOGIN_THROTTLE_BACKEND"] or MemoryBuckets(
+        app.config["LOGIN_THROTTLE_SIZE"]
+    )
+    app.extensions["login_throttle"] = LoginThrottle(
+        store,
+        {
+            "ip": (
+                app.config["LOGIN_THROTTLE_IP_PER_MINUTE"],
+                app.config["LOGIN_THROTTLE_IP_BURST"],
+            ),
+            "email": (
+                app.config["LOGIN_THROTTLE_EMAIL_PER_MINUTE"],
+                app.config["LOGIN_THROTTLE_EMAIL_BURST"],
+            ),
+        },
+    )
+
+
+def login_retry_after(ip, email):
+    """Seconds a login attempt has to wait, or 0 if it may go ahead."""
+    if not current_app.config["LOGIN_THROTTLE_ENABLED"]:
+        return 0
+    return math.ceil(current_app.extensions["login_throttle"].check(ip, email))
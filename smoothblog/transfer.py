@@ -0,0 +1,181 @@
+"""Streams users and blogs to and from newline delimited JSON files."""
+
+import gzip
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+
+from . import search
+from .counters import reconcile_post_counters
+from .database import db
+from .models import Blog, User, clean_text, summarize
+
+TABLES = {"user": User.__table__, "blog": Blog.__table__}
+COLUMNS = {
+    "user": ("id", "email", "username", "password", "is_admin"),
+    "blog": ("id", "title", "content", "date", "user_id"),
+}
+# Every column but these must be present and not null.
+OPTIONAL = {"user": ("is_admin",), "blog": ()}
+_TRIGGERS = ("blog_fts_insert", "blog_fts_update")
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)  # pylint: disable=unspecified-encoding
+
+
+def _encode(value):
+    return value.isoformat(sep=" ") if isinstance(value, datetime) else value
+
+
+def export_rows(path, batch_size=1000):
+    """Write every user and blog to `path`; return how many of each were written.
+
+    Rows are read `batch_size` at a time from one read transaction, so the file is a
+    consistent snapshot however long writing it takes.
+    """
+    counts = {}
+    with _open(path, "wb") as file:
+        for kind, table in TABLES.items():
+            columns = COLUMNS[kind]
+            rows = db.session.execute(
+                db.select(*(table.c[column] for column in columns))
+                .order_by(table.c.id)
+                .execution_options(yield_per=batch_size)
+            )
+            counts[kind] = 0
+            for row in rows:
+                record = {"type": kind}
+                record.update(zip(columns, map(_encode, row)))
+                file.write(json.dumps(record, ensure_ascii=False).encode() + b"\n")
+                counts[kind] += 1
+    db.session.rollback()
+    return counts
+
+
+def _row(kind, record):
+    row = {column: record.get(column) for column in COLUMNS[kind]}
+    missing = [
+        column
+        for column, value in row.items()
+        if value is None and column not in OPTIONAL[kind]
+    ]
+    if missing:
+        raise ValueError(f"{kind} is missing {', '.join(missing)}")
+    if kind == "blog":
+        for column in ("title", "content"):
+            row[column] = clean_text(row[column])
+        row["date"] = datetime.fromisoformat(row["date"])
+        row["excerpt"], row["word_count"], row["reading_time"] = summarize(
+            row["content"]
+        )
+    return row
+
+
+def _upsert(kind, rows):
+    table = TABLES[kind]
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={
+            column: statement.excluded[column] for column in rows[0] if column != "id"
+        },
+    )
+    db.session.execute(statement, rows)
+
+
+def _read_checkpoint(checkpoint):
+    try:
+        with open(checkpoint, encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"offset": 0, "lines": 0}
+
+
+def _write_checkpoint(checkpoint, position):
+    with open(checkpoint + ".partial", "w", encoding="utf-8") as file:
+        json.dump(position, file)
+    os.replace(checkpoint + ".partial", checkpoint)
+
+
+def _batches(file, position, batch_size):
+    """Yield `(kind, rows, first, end)` for each run of up to `batch_size` rows.
+
+    Every run holds rows of one type, the first on line `first`. `position` is the
+    checkpoint reading starts from and `end` the one just after the batch, each
+    holding a byte `offset` into the file and a count of `lines`.
+    """
+    kind, rows, first = None, [], None
+    offset, lines = position["offset"], position["lines"]
+    end = dict(position)
+    for line in file:
+        lines += 1
+        if line.strip():
+            try:
+                record = json.loads(line)
+                line_kind = record["type"]
+                if line_kind not in TABLES:
+                    raise ValueError(f"unknown type {line_kind!r}")
+                row = _row(line_kind, record)
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(f"Line {lines} is not valid: {exc}") from exc
+
+            if rows and (line_kind != kind or len(rows) == batch_size):
+                yield kind, rows, first, end
+                rows = []
+            if not rows:
+                first = lines
+            kind = line_kind
+            rows.append(row)
+        offset += len(line)
+        end = {"offset": offset, "lines": lines}
+    if rows:
+        yield kind, rows, first, end
+
+
+def import_rows(path, batch_size=1000, checkpoint=None):
+    """Load the users and blogs in `path`; return how many of each were loaded.
+
+    Resumes from `checkpoint` (`path` + ".checkpoint" by default) when it exists and
+    removes it once everything has been loaded, the post counters reconciled and the
+    search index rebuilt.
+    """
+    checkpoint = checkpoint or path + ".checkpoint"
+    position = _read_checkpoint(checkpoint)
+    counts = dict.fromkeys(TABLES, 0)
+
+    for trigger in _TRIGGERS:
+        db.session.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    db.session.commit()
+    try:
+        with _open(path, "rb") as file:
+            file.seek(position["offset"])
+            for kind, rows, first, end in _batches(file, position, batch_size):
+                try:
+                    _upsert(kind, rows)
+                    db.session.commit()
+                except IntegrityError as exc:
+                    # e.g. an email taken by another id, or a blog without its user.
+                    raise ValueError(
+                        f"Lines {first} to {end['lines']} could not be loaded: "
+                        f"{exc.orig}"
+                    ) from exc
+                _write_checkpoint(checkpoint, end)
+                counts[kind] += len(rows)
+    finally:
+        db.session.rollback()
+        search.create_index(db.session.connection())
+        db.session.commit()
+
+    search.rebuild_index(db.session.connection())
+    reconcile_post_counters()
+    db.session.commit()
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return counts
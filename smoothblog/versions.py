@@ -0,0 +1,126 @@
+"""Versions of the content, bumped by the database on every change the caches show."""
+
+import threading
+
+from flask import g
+from sqlalchemy import DDL, event, text
+from sqlalchemy.exc import OperationalError
+
+from .database import db
+from .models import Timestamp
+
+# `version` moves with every change the pages show. `record_version` only moves when
+# a cached blog or identity can go stale: blogs are updated or deleted, or users are
+# deleted or change a column other than their counters.
+_BUMP = (
+    "UPDATE content_version SET version = version + 1, "
+    "changed_at = CURRENT_TIMESTAMP; END"
+)
+_BUMP_RECORDS = (
+    "UPDATE content_version SET version = version + 1, "
+    "record_version = record_version + 1, changed_at = CURRENT_TIMESTAMP; END"
+)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS content_version ("
+    "id INTEGER PRIMARY KEY CHECK (id = 1), "
+    "version INTEGER NOT NULL, "
+    "record_version INTEGER NOT NULL DEFAULT 0, "
+    "changed_at DATETIME NOT NULL)",
+    "INSERT OR IGNORE INTO content_version (id, version, changed_at) "
+    "VALUES (1, 0, CURRENT_TIMESTAMP)",
+    "CREATE TRIGGER IF NOT EXISTS content_version_blog_insert AFTER INSERT ON blog "
+    f"BEGIN {_BUMP}",
+    "CREATE TRIGGER IF NOT EXISTS content_version_blog_update AFTER UPDATE ON blog "
+    f"BEGIN {_BUMP_RECORDS}",
+    "CREATE TRIGGER IF NOT EXISTS content_version_blog_delete AFTER DELETE ON blog "
+    f"BEGIN {_BUMP_RECORDS}",
+    "CREATE TRIGGER IF NOT EXISTS content_version_user_update "
+    "AFTER UPDATE OF username, email, is_admin ON user "
+    f"BEGIN {_BUMP_RECORDS}",
+    "CREATE TRIGGER IF NOT EXISTS content_version_user_counters "
+    "AFTER UPDATE OF post_count ON user "
+    f"BEGIN {_BUMP}",
+    "CREATE TRIGGER IF NOT EXISTS content_version_user_delete AFTER DELETE ON user "
+    f"BEGIN {_BUMP_RECORDS}",
+]
+TRIGGERS = [
+    "content_version_blog_insert",
+    "content_version_blog_update",
+    "content_version_blog_delete",
+    "content_version_user_update",
+    "content_version_user_counters",
+    "content_version_user_delete",
+]
+
+# After every table, since the triggers span blog and user.
+for _statement in SCHEMA:
+    event.listen(db.metadata, "after_create", DDL(_statement))
+event.listen(db.metadata, "before_drop", DDL("DROP TABLE IF EXISTS content_version"))
+
+_CURRENT = text(
+    "SELECT version, record_version, changed_at FROM content_version"
+).columns(changed_at=Timestamp)
+
+
+def create_version(connection):
+    """Create the version table, its row and its triggers if they do not exist yet."""
+    for statement in SCHEMA:
+        connection.exec_driver_sql(statement)
+
+
+def drop_triggers(connection):
+    """Drop the triggers, e.g. so `create_version` can replace them."""
+    for trigger in TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+
+
+def init_versions(app):
+    """Read the content version afresh at the start of every request of `app`.
+
+    Clears the caches of `app` kept in this process whenever the version they depend
+    on moved.
+    """
+    local = [
+        (name, column)
+        for name, setting, column in (
+            ("response_cache", "RESPONSE_CACHE_BACKEND", "version"),
+            ("user_cache", "USER_CACHE_BACKEND", "record_version"),
+            ("post_cache", "POST_CACHE_BACKEND", "record_version"),
+        )
+        if app.config[setting] is None
+    ]
+    seen = {"version": None, "record_version": None}
+    lock = threading.Lock()
+
+    @app.before_request
+    def check_content_version():
+        # Requests that share an app context, as in tests, also share `g`.
+        g.pop("content_version", None)
+        if not local:
+            return
+
+        try:
+            current = content_version()
+        except OperationalError:
+            # Not initialized or not upgraded yet, so there is nothing to compare.
+            db.session.rollback()
+            return
+        with lock:
+            moved = {
+                column
+                for column, version in seen.items()
+                if getattr(current, column) != version
+            }
+            for column in moved:
+                seen[column] = getattr(current, column)
+        for name, column in local:
+            if column in moved:
+                app.extensions[name].backend.clear()
+
+
+def content_version():
+    """The `version`, `record_version` and `changed_at` of the content, read once."""
+    if "content_version" not in g:
+        g.content_version = db.session.execute(_CURRENT).one()
+    return g.content_version
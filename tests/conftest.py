@@ -4,8 +4,10 @@ import os
 import tempfile
 
 import pytest
+from sqlalchemy import event
 from smoothblog import create_app
 from smoothblog.cli import init_db
+from smoothblog.counters import reconcile_post_counters
 from smoothblog.database import db
 from smoothblog.models import Blog, User
 
@@ -47,10 +49,14 @@ def app():
                 Blog("other title", "other content", other_user.id),
             ]
         )
+        reconcile_post_counters()
         db.session.commit()
 
     yield app
 
+    with app.app_context():
+        db.engine.dispose()
+
     os.close(db_fd)
     os.unlink(db_path)
 
@@ -61,6 +67,46 @@ def client(app):
     return app.test_client()
 
 
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Returns a clock for caches and buckets that only moves when told to."""
+    return FakeClock()
+
+
+class QueryCounter:
+    """Counts the SQL statements sent to the database."""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, *args):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def queries(app):
+    """Returns a counter of the statements executed while the test runs."""
+    counter = QueryCounter()
+    with app.app_context():
+        engine = db.engine
+
+    event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
+
+
 @pytest.fixture
 def runner(app):
     """Returns the test CLI runner."""
@@ -0,0 +1,206 @@
+"""Test the JSON API."""
+
+import pytest
+from smoothblog.database import db
+from smoothblog.models import Blog, User
+
+
+@pytest.fixture
+def token(client):
+    """A bearer token for the test user."""
+    response = client.post(
+        "/api/v1/tokens", json={"email": "test@email.com", "password": "test"}
+    )
+    return response.json["token"]
+
+
+def _auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_list_blogs(client):
+    """
+    GIVEN a test client
+    WHEN "/api/v1/blogs" is requested
+    THEN it should list the blogs newest first without their content
+    """
+    response = client.get("/api/v1/blogs")
+    assert response.status_code == 200
+
+    items = response.json["items"]
+    assert [item["title"] for item in items] == ["other title", "test title"]
+    assert set(items[0]) == {"id", "title", "date", "user_id", "author"}
+    assert items[0]["author"] == "other"
+    assert response.json["next"] is None
+
+
+def test_list_blogs_fields(client):
+    """
+    GIVEN a test client
+    WHEN blogs are listed with a field selection
+    THEN only those fields should be returned
+    """
+    response = client.get("/api/v1/blogs?fields=title,content")
+    assert response.json["items"][0] == {
+        "title": "other title",
+        "content": "other content",
+    }
+
+    response = client.get("/api/v1/blogs?fields=title,password")
+    assert response.status_code == 400
+    assert "password" in response.json["error"]
+
+
+def test_list_blogs_paginates(app, client):
+    """
+    GIVEN more blogs than fit on one page
+    WHEN the pages are followed through their cursors
+    THEN every blog should be listed exactly once
+    """
+    with app.app_context():
+        user_id = User.query.filter_by(username="test").one().id
+        db.session.add_all([Blog(f"blog {i}", "content", user_id) for i in range(5)])
+        db.session.commit()
+
+    titles = []
+    url = "/api/v1/blogs?fields=title&limit=3"
+    while True:
+        body = client.get(url).json
+        titles += [item["title"] for item in body["items"]]
+        if not body["next"]:
+            break
+        url = f"/api/v1/blogs?fields=title&limit=3&after={body['next']}"
+
+    assert len(titles) == 7
+    assert len(set(titles)) == 7
+    assert client.get("/api/v1/blogs?after=nonsense").status_code == 400
+
+
+def test_get_blog(client):
+    """
+    GIVEN a test client
+    WHEN a single blog is requested
+    THEN it should be returned with every field, or 404 if it does not exist
+    """
+    response = client.get("/api/v1/blogs/1")
+    assert response.status_code == 200
+    assert response.json["content"] == "test content"
+    assert response.json["author"] == "test"
+
+    assert client.get("/api/v1/blogs/1000").status_code == 404
+
+
+def test_create_token_wrong_password(client):
+    """
+    GIVEN a test client
+    WHEN a token is requested with the wrong password
+    THEN it should be refused
+    """
+    response = client.post(
+        "/api/v1/tokens", json={"email": "test@email.com", "password": "wrong"}
+    )
+    assert response.status_code == 401
+    assert "token" not in response.json
+
+
+def test_create_blog(client, token, queries):
+    """
+    GIVEN a valid token
+    WHEN a blog is created through the API
+    THEN it should be stored for the token's user without a session lookup
+    """
+    queries.statements.clear()
+    response = client.post(
+        "/api/v1/blogs",
+        json={"title": "api title", "content": "api content"},
+        headers=_auth(token),
+    )
+    assert response.status_code == 201
+    assert response.json["author"] == "test"
+    assert response.headers["Location"].endswith(f"/api/v1/blogs/{response.json['id']}")
+    assert not [s for s in queries.statements if s.startswith("SELECT user.")]
+
+    assert client.get("/api/v1/blogs").json["items"][0]["title"] == "api title"
+
+
+@pytest.mark.parametrize(
+    ("json", "message"),
+    [
+        ({"content": "content"}, "title is required"),
+        ({"title": "t" * 501, "content": "content"}, "longer than 500"),
+        ({"title": "title"}, "content is required"),
+    ],
+)
+def test_create_blog_validate_input(client, token, json, message):
+    """
+    GIVEN a valid token
+    WHEN a blog is created with invalid input
+    THEN it should be refused with an explanation
+    """
+    response = client.post("/api/v1/blogs", json=json, headers=_auth(token))
+    assert response.status_code == 400
+    assert message in response.json["error"]
+
+
+def test_create_blog_bad_token(client):
+    """
+    GIVEN a missing or tampered token
+    WHEN a blog is created through the API
+    THEN it should be refused
+    """
+    data = {"title": "title", "content": "content"}
+    assert client.post("/api/v1/blogs", json=data).status_code == 401
+    response = client.post("/api/v1/blogs", json=data, headers=_auth("forged.token"))
+    assert response.status_code == 401
+
+
+def test_delete_blog(client, token):
+    """
+    GIVEN a valid token
+    WHEN the user's own blog and someone else's blog are deleted
+    THEN only their own should be deleted
+    """
+    assert client.delete("/api/v1/blogs/1", headers=_auth(token)).status_code == 204
+    assert client.get("/api/v1/blogs/1").status_code == 404
+
+    assert client.delete("/api/v1/blogs/2", headers=_auth(token)).status_code == 403
+    assert client.delete("/api/v1/blogs/1000", headers=_auth(token)).status_code == 404
+
+
+def test_create_blog_deleted_user(app, client, token):
+    """
+    GIVEN a token whose user has since been deleted
+    WHEN a blog is created with it
+    THEN it should be refused
+    """
+    with app.app_context():
+        db.session.execute(db.delete(User).where(User.username == "test"))
+        db.session.commit()
+
+    response = client.post(
+        "/api/v1/blogs",
+        json={"title": "title", "content": "content"},
+        headers=_auth(token),
+    )
+    assert response.status_code == 401
+
+
+def test_delete_blog_admin(app, client):
+    """
+    GIVEN a token of an admin who is later demoted
+    WHEN someone else's blogs are deleted with it
+    THEN only deletions made while still an admin should succeed
+    """
+    response = client.post(
+        "/api/v1/tokens", json={"email": "admin@email.com", "password": "admin"}
+    )
+    headers = _auth(response.json["token"])
+    assert client.delete("/api/v1/blogs/1", headers=headers).status_code == 204
+
+    with app.app_context():
+        db.session.execute(
+            db.update(User).where(User.username == "admin").values(is_admin=False)
+        )
+        db.session.commit()
+
+    assert client.delete("/api/v1/blogs/2", headers=headers).status_code == 403
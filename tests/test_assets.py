@@ -0,0 +1,133 @@
+"""Test the static asset pipeline."""
+
+import gzip
+import json
+import os
+
+import pytest
+from smoothblog import assets
+
+CSS = b"body { color: red; }"
+JS = b"console.log(1);"
+
+
+@pytest.fixture
+def static_folder(tmp_path, monkeypatch):
+    """A static folder with one local asset and vendored assets that need no network."""
+    (tmp_path / "validate_form.js").write_text(
+        "// checks the form\n(() => {\n    validate();\n})();\n"
+    )
+    monkeypatch.setattr(
+        assets,
+        "VENDORED",
+        {
+            "bootstrap.min.css": ("https://cdn/bootstrap.css", assets.integrity(CSS)),
+            "bootstrap.bundle.min.js": (
+                "https://cdn/bootstrap.js",
+                assets.integrity(JS),
+            ),
+        },
+    )
+    return tmp_path
+
+
+def fetch(url):
+    """Stands in for downloading the vendored assets."""
+    return CSS if url.endswith(".css") else JS
+
+
+def test_build(static_folder):
+    """
+    GIVEN a static folder
+    WHEN the assets are built
+    THEN fingerprinted, minified and precompressed files should be written with a manifest
+    """
+    manifest = assets.build(str(static_folder), fetch=fetch)
+    dist = static_folder / "dist"
+
+    assert json.loads((dist / assets.MANIFEST).read_text()) == manifest
+    assert manifest["bootstrap.min.css"].startswith("bootstrap.")
+    assert manifest["bootstrap.min.css"].endswith(".min.css")
+    assert (dist / manifest["bootstrap.min.css"]).read_bytes() == CSS
+
+    script = manifest["validate_form.js"]
+    assert (dist / script).read_text() == "(() => {\nvalidate();\n})();"
+    assert (
+        gzip.decompress((dist / (script + ".gz")).read_bytes())
+        == (dist / script).read_bytes()
+    )
+
+    assert assets.build(str(static_folder), fetch=fetch) == manifest
+
+
+def test_build_integrity(static_folder):
+    """
+    GIVEN a vendored asset whose download was tampered with
+    WHEN the assets are built
+    THEN the build should fail
+    """
+    with pytest.raises(assets.IntegrityError):
+        assets.build(str(static_folder), fetch=lambda url: b"tampered")
+
+
+def test_minify_css():
+    """
+    GIVEN a stylesheet with comments, whitespace and a descendant pseudo-class
+    WHEN it is minified
+    THEN only the rules should be left, matching what they matched before
+    """
+    source = "/* header */\nh1 ,h2 {\n  color: red;\n  margin: 0 auto;\n}\n.a :hover {}"
+    assert assets.minify_css(source) == "h1,h2{color: red;margin: 0 auto;}.a :hover{}"
+
+
+def test_asset_url_fallback(app):
+    """
+    GIVEN assets that have not been built
+    WHEN their URLs are resolved
+    THEN vendored assets should come from their CDN and local ones from /static
+    """
+    app.extensions["assets"] = {}
+    with app.test_request_context():
+        assert assets.asset_url("bootstrap.min.css") == (
+            assets.VENDORED["bootstrap.min.css"][0]
+        )
+        assert assets.asset_url("validate_form.js") == "/static/validate_form.js"
+
+
+def test_serve(app, static_folder):
+    """
+    GIVEN built assets
+    WHEN a page and one of its assets are requested
+    THEN the page should link the fingerprinted asset and it should be served
+        precompressed with an immutable cache header
+    """
+    manifest = assets.build(str(static_folder), fetch=fetch)
+    app.static_folder = str(static_folder)
+    app.extensions["assets"] = manifest
+    client = app.test_client()
+
+    script = manifest["validate_form.js"]
+    response = client.get("/auth/login")
+    assert f'src="/assets/{script}"'.encode() in response.data
+    assert f'integrity="{assets.integrity(CSS)}"'.encode() in response.data
+
+    response = client.get(f"/assets/{script}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.content_encoding == "gzip"
+    assert response.mimetype == "text/javascript"
+    assert "Accept-Encoding" in response.vary
+    assert response.headers["Cache-Control"] == assets.IMMUTABLE
+    assert (
+        gzip.decompress(response.data) == (static_folder / "dist" / script).read_bytes()
+    )
+
+    response = client.get(f"/assets/{script}", headers={"Accept-Encoding": "gzip;q=0"})
+    assert response.content_encoding is None
+
+    response = client.get(f"/assets/{script}")
+    assert response.content_encoding is None
+    assert response.data == (static_folder / "dist" / script).read_bytes()
+
+    assert client.get("/assets/manifest.json").status_code == 404
+    assert client.get("/assets/missing.js").status_code == 404
+    assert not os.path.exists(os.path.join(app.root_path, "static", "dist"))
@@ -1,7 +1,12 @@
 """Test the auth routes."""
 
+import re
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from flask_login import current_user
+from smoothblog.database import db
+from smoothblog.deletion import init_deletion
 from smoothblog.models import Blog, User
 
 
@@ -239,6 +244,90 @@ def test_admin_logged_in(auth):
     assert "Users" in response.text
 
 
+def _admin_rows(response):
+    return re.findall(r"<td>(\S+@email\.com)</td>", response.text)
+
+
+def test_admin_pagination(app, client, auth):
+    """
+    GIVEN an admin page size of 2
+    WHEN the pages of "/auth/admin" are requested
+    THEN every user should be listed once, sorted by username
+    """
+    app.config["ADMIN_PAGE_SIZE"] = 2
+    auth.login("admin@email.com", "admin")
+
+    first = client.get("/auth/admin")
+    assert _admin_rows(first) == ["admin@email.com", "other@email.com"]
+    assert "page=2" in first.text
+
+    second = client.get("/auth/admin?page=2")
+    assert _admin_rows(second) == ["test@email.com"]
+    assert "page=3" not in second.text
+
+    descending = client.get("/auth/admin?sort=email&order=desc")
+    assert _admin_rows(descending) == ["test@email.com", "other@email.com"]
+
+    assert client.get("/auth/admin?page=99999999999999999999").status_code == 400
+
+
+def test_admin_prefix_filter(client, auth):
+    """
+    GIVEN a logged in admin test client
+    WHEN "/auth/admin" is filtered by a username or email prefix
+    THEN only the users starting with it should be listed
+    """
+    auth.login("admin@email.com", "admin")
+
+    assert _admin_rows(client.get("/auth/admin?q=oth")) == ["other@email.com"]
+    assert _admin_rows(client.get("/auth/admin?q=te")) == ["test@email.com"]
+    assert _admin_rows(client.get("/auth/admin?q=email")) == []
+
+
+def test_admin_prefix_filter_last_code_point(app, client, auth):
+    """
+    GIVEN a user whose username starts with the last Unicode code point
+    WHEN "/auth/admin" is filtered by prefixes ending with that code point
+    THEN the users starting with them should be listed
+    """
+    with app.app_context():
+        db.session.add(User("max@email.com", "\U0010ffffmax", "max"))
+        db.session.commit()
+    auth.login("admin@email.com", "admin")
+
+    assert _admin_rows(client.get("/auth/admin?q=\U0010ffff")) == ["max@email.com"]
+    assert _admin_rows(client.get("/auth/admin?q=\U0010ffffm")) == ["max@email.com"]
+    assert _admin_rows(client.get("/auth/admin?q=te\U0010ffff")) == []
+
+
+def test_admin_aggregates(client, auth, queries):
+    """
+    GIVEN users with different numbers of blogs
+    WHEN "/auth/admin" is sorted by blog count
+    THEN each user's blog count should come from their counters without counting blogs
+    """
+    auth.login("other@email.com", "other")
+    for title in ("one", "two"):
+        client.post("/create", data={"title": title, "content": "content"})
+    auth.logout()
+    auth.login("admin@email.com", "admin")
+
+    queries.statements.clear()
+    response = client.get("/auth/admin?sort=blog_count&order=desc")
+
+    assert _admin_rows(response) == [
+        "other@email.com",
+        "test@email.com",
+        "admin@email.com",
+    ]
+    assert re.search(r"<td>other</td>\s*<td>3</td>", response.text)
+    assert not [s for s in queries.statements if "FROM blog" in s]
+
+    for sort in ("username", "last_post"):
+        response = client.get(f"/auth/admin?sort={sort}")
+        assert len(_admin_rows(response)) == 3
+
+
 def test_delete_not_admin_user(client, auth):
     """
     GIVEN a logged in non-admin test client
@@ -287,3 +376,107 @@ def test_delete_admin_user_non_existent_user(client, auth):
         assert response.status_code == 200
         assert response.request.path == "/auth/admin"
         assert "User does not exist" in response.text
+
+
+def test_delete_selected_users(app, client, auth):
+    """
+    GIVEN a logged in admin test client
+    WHEN users, including an admin, are selected for deletion
+    THEN every selected non-admin user and their blogs should be deleted
+    """
+    with app.app_context():
+        ids = [user.id for user in User.query.order_by(User.id)]
+    auth.login("admin@email.com", "admin")
+
+    response = client.post(
+        "/auth/admin/delete", data={"user_id": ids}, follow_redirects=True
+    )
+    assert "Deleted 2 users" in response.text
+
+    with app.app_context():
+        assert [user.email for user in User.query] == ["admin@email.com"]
+        assert not Blog.query.count()
+
+
+def test_delete_selected_users_not_admin_user(app, client, auth):
+    """
+    GIVEN a logged in non-admin test client
+    WHEN users are selected for deletion
+    THEN no user should be deleted
+    """
+    auth.login()
+    response = client.post(
+        "/auth/admin/delete", data={"user_id": [1, 2, 3]}, follow_redirects=True
+    )
+    assert "You do not have permissions" in response.text
+
+    with app.app_context():
+        assert User.query.count() == 3
+
+
+def test_delete_user_in_chunks(app, client, auth, queries):
+    """
+    GIVEN a user with more blogs than the deletion chunk size
+    WHEN the user is deleted
+    THEN their blogs should be deleted over several transactions
+    """
+    app.config["USER_DELETE_CHUNK_SIZE"] = 2
+    with app.app_context():
+        user = User.query.filter_by(email="test@email.com").first()
+        user_id = user.id
+        db.session.add_all([Blog(f"blog {i}", "content", user_id) for i in range(4)])
+        db.session.commit()
+    auth.login("admin@email.com", "admin")
+
+    queries.statements.clear()
+    client.get(f"/auth/admin/delete/{user_id}")
+
+    assert len([s for s in queries.statements if s.startswith("DELETE FROM blog")]) == 4
+    with app.app_context():
+        assert not Blog.query.filter_by(user_id=user_id).count()
+        assert not User.query.get(user_id)
+        assert Blog.query.count() == 1
+
+
+def test_delete_user_in_background(app, client, auth):
+    """
+    GIVEN an app deleting users in the background
+    WHEN a user is deleted
+    THEN the request should return straight away and the worker delete the user
+    """
+    executor = ThreadPoolExecutor(1)
+    app.extensions["user_deletion"] = executor
+    with app.app_context():
+        user_id = User.query.filter_by(email="test@email.com").first().id
+    auth.login("admin@email.com", "admin")
+
+    response = client.get(f"/auth/admin/delete/{user_id}", follow_redirects=True)
+    assert "will be deleted shortly" in response.text
+
+    executor.shutdown(wait=True)
+    with app.app_context():
+        assert not User.query.get(user_id)
+        assert not Blog.query.filter_by(user_id=user_id).count()
+
+
+def test_resume_pending_deletions(app, runner):
+    """
+    GIVEN a user whose deletion was cut short by a restart
+    WHEN the app starts again and `flask resume-deletions` is run
+    THEN the user should only be deleted by the command
+    """
+    with app.app_context():
+        user = User.query.filter_by(email="test@email.com").first()
+        user_id, user.pending_deletion = user.id, True
+        db.session.commit()
+
+    init_deletion(app)
+    with app.app_context():
+        assert User.query.get(user_id)
+
+    result = runner.invoke(args=["resume-deletions"])
+    assert "Deleted 1 users" in result.output
+    with app.app_context():
+        assert not User.query.get(user_id)
+        assert not Blog.query.filter_by(user_id=user_id).count()
+        assert User.query.filter_by(email="other@email.com").first()
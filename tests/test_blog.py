@@ -1,8 +1,12 @@
 """Test the blog routes."""
 
+from xml.etree import ElementTree
+
 import pytest
 from flask_login import current_user
+from smoothblog.database import db
 from smoothblog.models import Blog, User
+from smoothblog.pagination import row_cursor
 
 
 def test_index(client):
@@ -142,3 +146,291 @@ def test_delete_logged_in_not_matches(client, auth):
         assert response.request.path == "/home"
         assert "Blog cannot be deleted" in response.text
         assert Blog.query.get(blog.id) is not None
+
+
+def test_home_paginates(app, client):
+    """
+    GIVEN a test client and a page size of one
+    WHEN the "Older" and "Newer" links on "/home" are followed
+    THEN it should walk through the blogs newest first and back again
+    """
+    app.config["BLOG_PAGE_SIZE"] = 1
+
+    first = client.get("/home")
+    assert "other title" in first.text
+    assert "test title" not in first.text
+
+    with app.test_request_context():
+        blog = Blog.query.filter_by(title="other title").first()
+        cursor = row_cursor(blog, (Blog.date, Blog.id))
+
+    second = client.get(f"/home?after={cursor}")
+    assert "test title" in second.text
+    assert "other title" not in second.text
+    assert "?before=" in second.text
+
+    with app.test_request_context():
+        blog = Blog.query.filter_by(title="test title").first()
+        cursor = row_cursor(blog, (Blog.date, Blog.id))
+
+    back = client.get(f"/home?before={cursor}")
+    assert "other title" in back.text
+    assert "?before=" not in back.text
+
+
+def test_home_pagination_stable_under_inserts(app, client):
+    """
+    GIVEN a test client that has loaded the first page of "/home"
+    WHEN a new blog is created before the next page is requested
+    THEN the next page should not repeat or skip any blogs
+    """
+    app.config["BLOG_PAGE_SIZE"] = 1
+
+    with app.test_request_context():
+        newest = Blog.query.filter_by(title="other title").first()
+        cursor = row_cursor(newest, (Blog.date, Blog.id))
+        db.session.add(Blog("brand new title", "content", newest.user_id))
+        db.session.commit()
+
+    response = client.get(f"/home?after={cursor}")
+    assert "test title" in response.text
+    assert "brand new title" not in response.text
+
+
+def test_home_invalid_cursor(client):
+    """
+    GIVEN a test client
+    WHEN a request to "/home" is made with a malformed cursor
+    THEN it should respond with a bad request
+    """
+    assert client.get("/home?after=not-a-cursor").status_code == 400
+
+
+def test_home_constant_query_count(app, client, queries):
+    """
+    GIVEN a test client
+    WHEN "/home" is requested before and after more authors post blogs
+    THEN it should run the same number of queries
+    """
+    app.config["RESPONSE_CACHE_ENABLED"] = False
+    client.get("/home")
+    before = queries.count
+
+    with app.app_context():
+        for i in range(5):
+            user = User(f"author{i}@email.com", f"author{i}", "password")
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Blog(f"title {i}", "content", user.id))
+        db.session.commit()
+
+    queries.count = 0
+    response = client.get("/home")
+    assert "author4" in response.text
+    assert queries.count == before
+
+
+def test_home_conditional_get(client, queries):
+    """
+    GIVEN a test client that already has the home page
+    WHEN it requests "/home" again with If-None-Match
+    THEN it should get a 304 without the listing being queried
+    """
+    first = client.get("/home")
+    assert first.headers["ETag"]
+
+    queries.count = 0
+    response = client.get("/home", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert not response.data
+    assert queries.count == 1
+
+
+def test_home_if_modified_since(app, client, auth):
+    """
+    GIVEN a test client that already has the home page
+    WHEN it revalidates with If-Modified-Since before and after a blog is deleted
+    THEN it should get a 304, then the page without the deleted blog
+    """
+    with app.app_context():
+        db.session.execute(
+            db.text("UPDATE content_version SET changed_at = '2000-01-01 00:00:00'")
+        )
+        db.session.commit()
+        blog_id = Blog.query.filter_by(title="test title").one().id
+    first = client.get("/home")
+    assert first.headers["Last-Modified"] == "Sat, 01 Jan 2000 00:00:00 GMT"
+    headers = {"If-Modified-Since": first.headers["Last-Modified"]}
+    assert client.get("/home", headers=headers).status_code == 304
+
+    auth.login()
+    client.get(f"/delete/{blog_id}")
+    auth.logout()
+
+    response = client.get("/home", headers=headers)
+    assert response.status_code == 200
+    assert "test title" not in response.text
+
+
+def test_home_etag_changes(client, auth):
+    """
+    GIVEN a test client that already has the home page
+    WHEN a blog is created or the viewer logs in
+    THEN the old ETag should no longer match
+    """
+    etag = client.get("/home").headers["ETag"]
+
+    auth.login(follow_redirects=True)
+    response = client.get("/home", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    etag = response.headers["ETag"]
+    client.post(
+        "/create",
+        data={"title": "title", "content": "content"},
+        follow_redirects=True,
+    )
+    response = client.get("/home", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    ("path", "mimetype", "root"),
+    [
+        ("/feed.atom", "application/atom+xml", "feed"),
+        ("/feed.rss", "application/rss+xml", "rss"),
+    ],
+)
+def test_feed(client, path, mimetype, root):
+    """
+    GIVEN a test client
+    WHEN a feed is requested
+    THEN it should list the newest blogs with their authors
+    """
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+
+    tree = ElementTree.fromstring(response.data)
+    assert tree.tag.endswith(root)
+    assert "other title" in response.text
+    assert "other@email.com" in response.text
+    assert response.text.index("other title") < response.text.index("test title")
+
+
+def test_feed_cached_until_blogs_change(client, auth, queries):
+    """
+    GIVEN a feed that has been requested once
+    WHEN it is requested again, before and after a blog is created
+    THEN it should only be rendered again once the blogs changed, and the listing
+    version should be read once per request
+    """
+    client.get("/feed.atom")
+
+    queries.statements.clear()
+    assert client.get("/feed.atom").status_code == 200
+    assert not [s for s in queries.statements if "JOIN user" in s]
+    assert len([s for s in queries.statements if "content_version" in s]) == 1
+
+    auth.login(follow_redirects=True)
+    client.post(
+        "/create",
+        data={"title": "fresh title", "content": "content"},
+        follow_redirects=True,
+    )
+    auth.logout()
+
+    assert "fresh title" in client.get("/feed.atom").text
+
+
+def test_feed_conditional_get(client):
+    """
+    GIVEN a test client that already has the feed
+    WHEN it polls the feed again with If-None-Match
+    THEN it should get a 304
+    """
+    etag = client.get("/feed.rss").headers["ETag"]
+
+    response = client.get("/feed.rss", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_home_shows_excerpts(app, client, queries):
+    """
+    GIVEN a blog longer than its excerpt
+    WHEN "/home" is requested
+    THEN only the excerpt should be shown and the content should not be loaded
+    """
+    with app.app_context():
+        user = User.query.filter_by(username="test").one()
+        db.session.add(
+            Blog("long title", "start " + "middle " * 100 + "conclusion", user.id)
+        )
+        db.session.commit()
+
+    queries.statements.clear()
+    response = client.get("/home")
+
+    assert "long title" in response.text
+    assert "start middle" in response.text
+    assert "conclusion" not in response.text
+    assert "1 min read" in response.text
+    assert not [s for s in queries.statements if "blog.content" in s]
+
+
+def test_post(client):
+    """
+    GIVEN a test client
+    WHEN a single blog is requested
+    THEN it should show the full content, or 404 if the blog does not exist
+    """
+    response = client.get("/blog/1")
+    assert response.status_code == 200
+    assert "test content" in response.text
+    assert 'href="/user/test"' in response.text
+
+    assert client.get("/blog/1000").status_code == 404
+
+
+def test_post_cached(client, queries):
+    """
+    GIVEN a single post page that has been requested once
+    WHEN it is requested again
+    THEN it should be served from the post cache without querying the blog
+    """
+    first = client.get("/blog/1")
+
+    queries.statements.clear()
+    second = client.get("/blog/1")
+
+    assert second.text == first.text
+    assert not [s for s in queries.statements if "FROM blog" in s]
+
+
+def test_post_cache_forgets_deleted_blogs(client, auth):
+    """
+    GIVEN a cached single post page
+    WHEN its blog is deleted
+    THEN the page should no longer be found
+    """
+    auth.login(follow_redirects=True)
+    assert client.get("/blog/1").status_code == 200
+
+    client.get("/delete/1")
+    assert client.get("/blog/1").status_code == 404
+
+
+def test_post_cache_forgets_deleted_users(app, client, auth):
+    """
+    GIVEN a cached single post page
+    WHEN its author is deleted
+    THEN the page should no longer be found
+    """
+    auth.login("admin@email.com", "admin", follow_redirects=True)
+    assert "Delete" in client.get("/blog/1").text
+
+    with app.app_context():
+        user_id = User.query.filter_by(username="test").one().id
+    client.get(f"/auth/admin/delete/{user_id}")
+
+    assert client.get("/blog/1").status_code == 404
@@ -0,0 +1,212 @@
+"""Test the response cache."""
+
+import pytest
+from smoothblog.cache import LRUCache, RedisCache, response_cache
+from smoothblog.database import db
+from smoothblog.models import Blog
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands the cache uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        """Return the stored value."""
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):  # pylint: disable=unused-argument
+        """Store a value."""
+        self.data[key] = value
+
+    def incr(self, key):
+        """Increment a counter."""
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """
+    GIVEN a full LRU cache
+    WHEN another entry is stored
+    THEN the least recently used entry should be evicted
+    """
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries(clock):
+    """
+    GIVEN an LRU cache entry
+    WHEN its TTL has passed
+    THEN it should no longer be returned
+    """
+    cache = LRUCache(clock=clock)
+    cache.set("a", 1, ttl=10)
+
+    clock.now = 9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+
+
+def test_redis_cache_clear_bumps_generation():
+    """
+    GIVEN a Redis backed cache
+    WHEN it is cleared
+    THEN previously stored values should no longer be returned
+    """
+    cache = RedisCache(FakeRedis())
+    cache.set("a", (b"body", "text/html"), ttl=60)
+    assert cache.get("a") == (b"body", "text/html")
+
+    cache.clear()
+    assert cache.get("a") is None
+
+
+@pytest.mark.parametrize("path", ["/home", "/about"])
+def test_anonymous_pages_are_cached(app, client, path):
+    """
+    GIVEN an anonymous test client
+    WHEN the same page is requested twice
+    THEN the second response should come from the cache
+    """
+    first = client.get(path)
+    second = client.get(path)
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.text == first.text
+    with app.test_request_context():
+        assert response_cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_custom_backend(app, client):
+    """
+    GIVEN an app configured with a Redis backend
+    WHEN the home page is requested twice
+    THEN it should be served from that backend
+    """
+    app.config["RESPONSE_CACHE_BACKEND"] = RedisCache(FakeRedis())
+    response_cache.init_app(app)
+
+    client.get("/home")
+    assert client.get("/home").headers["X-Cache"] == "HIT"
+
+
+def test_logged_in_pages_are_not_cached(client, auth):
+    """
+    GIVEN a logged in test client
+    WHEN the home page is requested
+    THEN it should not go through the cache
+    """
+    auth.login(follow_redirects=True)
+    assert "X-Cache" not in client.get("/home").headers
+
+
+def test_disabled_cache(app, client):
+    """
+    GIVEN an app with the response cache disabled
+    WHEN the home page is requested
+    THEN it should not go through the cache
+    """
+    app.config["RESPONSE_CACHE_ENABLED"] = False
+    assert "X-Cache" not in client.get("/home").headers
+
+
+def test_create_invalidates_cache(client, auth):
+    """
+    GIVEN a cached home page
+    WHEN a new blog is created
+    THEN anonymous visitors should see it straight away
+    """
+    client.get("/home")
+    auth.login(follow_redirects=True)
+    client.post(
+        "/create",
+        data={"title": "fresh title", "content": "content"},
+        follow_redirects=True,
+    )
+    auth.logout()
+
+    response = client.get("/home")
+    assert response.headers["X-Cache"] == "MISS"
+    assert "fresh title" in response.text
+
+
+def test_delete_invalidates_cache(client, auth):
+    """
+    GIVEN a cached home page
+    WHEN a blog is deleted
+    THEN anonymous visitors should no longer see it
+    """
+    client.get("/home")
+    auth.login(follow_redirects=True)
+    client.get("/delete/1")
+    auth.logout()
+
+    response = client.get("/home")
+    assert response.headers["X-Cache"] == "MISS"
+    assert "test title" not in response.text
+
+
+def test_user_delete_invalidates_cache(client, auth):
+    """
+    GIVEN a cached home page
+    WHEN an admin deletes a user
+    THEN anonymous visitors should no longer see their blogs
+    """
+    client.get("/home")
+    auth.login("admin@email.com", "admin", follow_redirects=True)
+    client.get("/auth/admin/delete/2")
+    auth.logout()
+
+    response = client.get("/home")
+    assert response.headers["X-Cache"] == "MISS"
+    assert "test title" not in response.text
+
+
+def test_change_by_other_worker_invalidates_cache(app, client):
+    """
+    GIVEN a cached home page and blog page
+    WHEN another worker deletes the blog, leaving this worker's caches alone
+    THEN the next request should notice and stop serving it
+    """
+    client.get("/home")
+    client.get("/blog/1")
+    with app.app_context():
+        db.session.execute(db.delete(Blog).where(Blog.id == 1))
+        db.session.commit()
+
+    response = client.get("/home")
+    assert response.headers["X-Cache"] == "MISS"
+    assert "test title" not in response.text
+    assert client.get("/blog/1").status_code == 404
+
+
+def test_new_blog_by_other_worker_keeps_posts_and_users(app, client, auth):
+    """
+    GIVEN a cached blog page and a cached identity
+    WHEN another worker creates a blog
+    THEN the post and user caches should keep serving them
+    """
+    auth.login()
+    client.get("/blog/1")
+    client.get("/blog/1")
+    with app.app_context():
+        db.session.add(Blog(title="other", content="other content", user_id=1))
+        db.session.commit()
+    posts = app.extensions["post_cache"].stats()
+    users = app.extensions["user_cache"].stats()
+
+    assert client.get("/blog/1").status_code == 200
+    assert app.extensions["post_cache"].stats()["hits"] == posts["hits"] + 1
+    assert app.extensions["user_cache"].stats()["hits"] == users["hits"] + 1
@@ -0,0 +1,171 @@
+"""Test the response compression."""
+
+import gzip
+import zlib
+
+import pytest
+from flask import Response, stream_with_context
+from flask_wtf.csrf import generate_csrf
+from smoothblog import compression
+
+
+@pytest.fixture
+def streamed(app):
+    """A route that streams its body and records how far it got, and a small page."""
+    produced = []
+    app.add_url_rule("/small", "small", lambda: "<p>Too small to bother.</p>")
+
+    @app.route("/streamed")
+    def stream():
+        def chunks():
+            for i in range(3):
+                produced.append(i)
+                yield f"<p>chunk {i}</p>" * 300
+
+        return Response(stream_with_context(chunks()), mimetype="text/html")
+
+    return produced
+
+
+def test_gzip(client):
+    """
+    GIVEN a client that accepts gzip
+    WHEN a large page is requested
+    THEN it should be gzipped with a weak ETag that still revalidates
+    """
+    plain = client.get("/home")
+    response = client.get("/home", headers={"Accept-Encoding": "gzip"})
+
+    assert response.content_encoding == "gzip"
+    assert "Accept-Encoding" in response.vary
+    assert gzip.decompress(response.data) == plain.data
+    assert len(response.data) < len(plain.data)
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert response.headers["ETag"] == "W/" + plain.headers["ETag"]
+
+    response = client.get(
+        "/home",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.usefixtures("streamed")
+def test_not_compressed(client):
+    """
+    GIVEN responses that must not or need not be compressed
+    WHEN they are requested
+    THEN they should be sent as they are
+    """
+    response = client.get("/home")
+    assert response.content_encoding is None
+    assert "Accept-Encoding" in response.vary
+
+    response = client.get("/home", headers={"Accept-Encoding": "gzip;q=0"})
+    assert response.content_encoding is None
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert response.content_encoding is None
+
+    response = client.get(
+        "/static/validate_form.js", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.content_encoding is None
+
+
+def test_secrets_not_compressed(app, client, auth):
+    """
+    GIVEN pages carrying a CSRF token or rendered for a logged in user
+    WHEN they are requested with gzip
+    THEN they should be sent uncompressed, so their size cannot leak the secret
+    """
+    app.add_url_rule(
+        "/form", "form", lambda: f"<p>{generate_csrf()}</p>" + "<p>filler</p>" * 300
+    )
+    headers = {"Accept-Encoding": "gzip"}
+    assert client.get("/form", headers=headers).content_encoding is None
+
+    auth.login()
+    client.get("/home")  # Shows the login flash message.
+    response = client.get("/home", headers=headers)
+    assert response.content_encoding is None
+    not_modified = client.get(
+        "/home", headers={**headers, "If-None-Match": response.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+
+
+def test_streamed(client, streamed):
+    """
+    GIVEN a streamed response
+    WHEN it is requested with gzip
+    THEN each chunk should be compressed and flushed as soon as it is big enough
+    """
+    response = client.get(
+        "/streamed", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+    assert response.content_encoding == "gzip"
+    assert "Content-Length" not in response.headers
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = response.iter_encoded()
+    first = decompressor.decompress(next(body))
+    assert first == b"<p>chunk 0</p>" * 300
+    assert streamed == [0]
+
+    rest = b"".join(decompressor.decompress(chunk) for chunk in body)
+    assert rest == b"<p>chunk 1</p>" * 300 + b"<p>chunk 2</p>" * 300
+    assert decompressor.eof
+    response.close()
+
+
+def test_compress_stream_gathers_small_chunks():
+    """
+    GIVEN a stream of chunks smaller than the flush size
+    WHEN it is compressed
+    THEN they should be flushed together, once enough of them have arrived
+    """
+    chunks = [f"<li>row {i}</li>" for i in range(200)]
+    compressed = list(
+        compression.compress_stream(compression.GzipEncoder(6), chunks, 1024)
+    )
+
+    assert len(compressed) == 4
+    assert gzip.decompress(b"".join(compressed)) == "".join(chunks).encode()
+
+
+def test_head_and_not_modified_match_get(client):
+    """
+    GIVEN a client that accepts gzip
+    WHEN a page is requested with HEAD, and revalidated
+    THEN both should have the headers of the gzipped GET
+    """
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get("/home", headers=headers)
+
+    head = client.head("/home", headers=headers)
+    assert not head.data
+    for name in ("Content-Encoding", "Content-Length", "ETag", "Vary"):
+        assert head.headers[name] == response.headers[name]
+
+    not_modified = client.get(
+        "/home", headers={**headers, "If-None-Match": response.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+    assert "Accept-Encoding" in not_modified.vary
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_brotli(client):
+    """
+    GIVEN a client that prefers brotli
+    WHEN a large page is requested
+    THEN it should be compressed with brotli
+    """
+    plain = client.get("/home")
+    response = client.get("/home", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.content_encoding == "br"
+    assert compression.brotli.decompress(response.data) == plain.data
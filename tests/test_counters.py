@@ -0,0 +1,86 @@
+"""Test the per user post counters and author pages."""
+
+from smoothblog.database import db
+from smoothblog.models import Blog, User
+
+
+def _counters(app, username):
+    with app.app_context():
+        user = User.query.filter_by(username=username).one()
+        return user.post_count, user.last_posted_at
+
+
+def test_counters_follow_create_and_delete(app, client, auth):
+    """
+    GIVEN a logged in test client
+    WHEN blogs are created and deleted
+    THEN the author's post count and last post date should follow along
+    """
+    auth.login(follow_redirects=True)
+    client.post("/create", data={"title": "new", "content": "content"})
+
+    count, last_posted_at = _counters(app, "test")
+    assert count == 2
+    with app.app_context():
+        newest = Blog.query.filter_by(title="new").one()
+        assert last_posted_at == newest.date
+        newest_id = newest.id
+
+    client.get(f"/delete/{newest_id}")
+    client.get("/delete/1")
+    assert _counters(app, "test") == (0, None)
+
+
+def test_reconcile_counters_command(app, runner):
+    """
+    GIVEN counters that drifted from the blogs
+    WHEN the reconcile-counters command is run
+    THEN the drifted counters should be fixed and counted
+    """
+    with app.app_context():
+        db.session.execute(db.update(User).values(post_count=7))
+        db.session.commit()
+
+    result = runner.invoke(args=["reconcile-counters"])
+    assert "Fixed the counters of 3 users" in result.output
+    assert _counters(app, "other")[0] == 1
+    assert _counters(app, "admin") == (0, None)
+
+    result = runner.invoke(args=["reconcile-counters"])
+    assert "Fixed the counters of 0 users" in result.output
+
+
+def test_author_page(app, client):
+    """
+    GIVEN a test client
+    WHEN an author's page is requested
+    THEN it should show their counters and only their blogs
+    """
+    response = client.get("/user/test")
+    assert response.status_code == 200
+    assert "1 blog" in response.text
+    assert "test title" in response.text
+    assert "other title" not in response.text
+
+    assert client.get("/user/nobody").status_code == 404
+    assert client.get("/user/test?after=nonsense").status_code == 400
+
+
+def test_author_page_paginates(app, client):
+    """
+    GIVEN an author with more blogs than fit on one page
+    WHEN their pages are followed
+    THEN every one of their blogs should be listed once
+    """
+    app.config["BLOG_PAGE_SIZE"] = 2
+    with app.app_context():
+        user_id = User.query.filter_by(username="test").one().id
+        db.session.add_all([Blog(f"extra {i}", "content", user_id) for i in range(3)])
+        db.session.commit()
+
+    first = client.get("/user/test")
+    assert first.text.count('class="card mb-4" id="blog-') == 2
+    cursor = first.text.split("after=")[1].split('"')[0]
+    second = client.get(f"/user/test?after={cursor}")
+    assert second.text.count('class="card mb-4" id="blog-') == 2
+    assert "test title" in second.text
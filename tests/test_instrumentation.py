@@ -0,0 +1,92 @@
+"""Test the request instrumentation."""
+
+import logging
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from smoothblog.database import db
+
+
+def test_server_timing_header(client):
+    """
+    GIVEN a test client
+    WHEN the home page is requested
+    THEN its timings should be sent in a Server-Timing header
+    """
+    timing = client.get("/home").headers["Server-Timing"]
+    assert timing.startswith("app;dur=")
+    assert 'desc="2 queries"' in timing
+    assert "tpl;dur=" in timing
+
+
+def test_server_timing_disabled(app, client):
+    """
+    GIVEN an app with the Server-Timing header turned off
+    WHEN a page is requested
+    THEN the header should not be sent
+    """
+    app.config["SERVER_TIMING"] = False
+    assert "Server-Timing" not in client.get("/about").headers
+
+
+def test_slow_query_log(app, client, caplog):
+    """
+    GIVEN a slow query threshold every statement exceeds
+    WHEN the home page is requested
+    THEN its statements should be logged with the endpoint that ran them
+    """
+    app.config["SLOW_QUERY_THRESHOLD_MS"] = 0
+
+    with caplog.at_level(logging.WARNING, logger="smoothblog.slow_queries"):
+        client.get("/home")
+
+    assert "in blog.home: SELECT" in caplog.text
+
+
+def test_failed_statement(app, caplog):
+    """
+    GIVEN a statement that raises
+    WHEN the connection is used again
+    THEN nothing should be left behind on it and later statements should be timed
+    """
+    app.config["SLOW_QUERY_THRESHOLD_MS"] = 0
+    with app.app_context(), db.engine.connect() as connection:
+        info = dict(connection.info)
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql("SELECT * FROM missing_table")
+        assert connection.info == info
+
+        with caplog.at_level(logging.WARNING, logger="smoothblog.slow_queries"):
+            connection.exec_driver_sql("SELECT 1")
+    assert "in cli: SELECT 1" in caplog.text
+
+
+def test_metrics(client, auth):
+    """
+    GIVEN a logged in admin test client
+    WHEN a request to "/auth/admin/metrics" is made
+    THEN it should export the totals in the Prometheus text format
+    """
+    client.get("/home")
+    auth.login("admin@email.com", "admin")
+    response = client.get("/auth/admin/metrics")
+
+    assert response.mimetype == "text/plain"
+    assert 'smoothblog_requests_total{endpoint="blog.home",status="200"} 1' in (
+        response.text
+    )
+    assert "# TYPE smoothblog_sql_statements_total counter" in response.text
+    assert "smoothblog_response_cache_misses_total 1" in response.text
+    assert "# TYPE smoothblog_log_records_dropped_total counter" in response.text
+
+
+def test_metrics_not_admin_user(client, auth):
+    """
+    GIVEN a logged in non-admin test client
+    WHEN a request to "/auth/admin/metrics" is made
+    THEN it should redirect to "/home" with info message
+    """
+    auth.login()
+    response = client.get("/auth/admin/metrics", follow_redirects=True)
+    assert response.request.path == "/home"
+    assert "You do not have permissions to access that page" in response.text
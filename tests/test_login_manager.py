@@ -0,0 +1,54 @@
+"""Test loading users for Flask-Login."""
+
+from flask_login import current_user
+from smoothblog.login_manager import load_user
+
+
+def _user_selects(queries):
+    return [statement for statement in queries.statements if "FROM user" in statement]
+
+
+def test_load_user_is_cached(app, client, auth, queries):
+    """
+    GIVEN a logged in test client
+    WHEN several pages are requested
+    THEN the user should only be read from the database once
+    """
+    auth.login(follow_redirects=True)
+    queries.statements.clear()
+
+    with client:
+        client.get("/about")
+        client.get("/create")
+        assert current_user.username == "test"
+
+    assert len(_user_selects(queries)) <= 1
+    stats = app.extensions["user_cache"].stats()
+    assert stats["hits"] >= 1
+
+
+def test_load_user_unknown_id(app):
+    """
+    GIVEN a session pointing at a user id that does not exist
+    WHEN the user is loaded
+    THEN nobody should be logged in
+    """
+    with app.test_request_context():
+        assert load_user("1000") is None
+        assert load_user("invalid") is None
+
+
+def test_deleted_user_is_logged_out(app, client, auth):
+    """
+    GIVEN a logged in user whose identity is cached
+    WHEN an admin deletes them
+    THEN their next request should be anonymous
+    """
+    auth.login(follow_redirects=True)
+
+    admin = app.test_client()
+    admin.post("/auth/login", data={"email": "admin@email.com", "password": "admin"})
+    admin.get("/auth/admin/delete/2")
+
+    response = client.get("/create", follow_redirects=True)
+    assert response.request.path == "/auth/login"
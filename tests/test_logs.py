@@ -0,0 +1,207 @@
+"""Test the queued logging pipeline."""
+
+import io
+import json
+import logging
+import queue
+import sys
+import threading
+
+from smoothblog import _init_logging
+from smoothblog.logs import (
+    BoundedQueueHandler,
+    JsonFormatter,
+    dropped_records,
+    queue_handlers,
+    stop_listeners,
+)
+
+
+def _record(message="hello %s", args=("world",)):
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, args, None)
+
+
+def test_full_queue_drops_records():
+    """
+    GIVEN a handler whose queue is full
+    WHEN another record is logged
+    THEN it should be dropped and counted instead of blocking
+    """
+    handler = BoundedQueueHandler(queue.Queue(1))
+    handler.handle(_record())
+    handler.handle(_record())
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_full_queue_blocks_briefly():
+    """
+    GIVEN a handler with the block policy whose queue is full
+    WHEN another record is logged
+    THEN it should wait for the timeout before dropping the record
+    """
+    handler = BoundedQueueHandler(queue.Queue(1), policy="block", timeout=0.01)
+    handler.handle(_record())
+    handler.handle(_record())
+
+    assert handler.dropped == 1
+
+
+def test_json_formatter():
+    """
+    GIVEN a JSON formatter
+    WHEN a record is formatted
+    THEN it should be a JSON object holding the message
+    """
+    entry = json.loads(JsonFormatter().format(_record()))
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+
+
+def test_json_formatter_exception():
+    """
+    GIVEN a JSON formatter
+    WHEN a record with an exception is formatted
+    THEN it should include the traceback
+    """
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.getLogger("test").makeRecord(
+            "test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info()
+        )
+
+    assert "ValueError: boom" in json.loads(JsonFormatter().format(record))["exception"]
+
+
+def test_queue_handlers(tmp_path):
+    """
+    GIVEN a logger writing to a file
+    WHEN its handlers are moved behind a queue
+    THEN records should still reach the file once the listener stops
+    """
+    logger = logging.getLogger("smoothblog.tests.queue")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    file_handler = logging.FileHandler(tmp_path / "test.log")
+    logger.addHandler(file_handler)
+
+    queue_handlers(logger, size=10)
+    assert isinstance(logger.handlers[0], BoundedQueueHandler)
+
+    logger.info("queued %s", "message")
+    stop_listeners()
+    file_handler.close()
+    logger.handlers.clear()
+
+    assert "queued message" in (tmp_path / "test.log").read_text()
+
+
+def test_queue_handlers_exception(tmp_path):
+    """
+    GIVEN a logger writing JSON to a file behind a queue
+    WHEN an exception is logged
+    THEN its traceback should be in the "exception" field
+    """
+    logger = logging.getLogger("smoothblog.tests.queue_exception")
+    logger.propagate = False
+    file_handler = logging.FileHandler(tmp_path / "test.log")
+    file_handler.setFormatter(JsonFormatter())
+    logger.addHandler(file_handler)
+
+    queue_handlers(logger, size=10)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed %s", "badly")
+    stop_listeners()
+    file_handler.close()
+    logger.handlers.clear()
+
+    entry = json.loads((tmp_path / "test.log").read_text())
+    assert entry["message"] == "failed badly"
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_queue_handlers_keep():
+    """
+    GIVEN a logger with two named handlers
+    WHEN its handlers are moved behind a queue, keeping one of them
+    THEN the kept handler should stay on the logger
+    """
+    logger = logging.getLogger("smoothblog.tests.queue_keep")
+    logger.propagate = False
+    kept, moved = logging.NullHandler(), logging.NullHandler()
+    kept.name, moved.name = "wsgi", "file"
+    logger.addHandler(kept)
+    logger.addHandler(moved)
+
+    queue_handlers(logger, size=10, keep=("wsgi",))
+    stop_listeners()
+
+    assert logger.handlers[0] is kept
+    assert isinstance(logger.handlers[1], BoundedQueueHandler)
+    logger.handlers.clear()
+
+
+class BlockingHandler(logging.Handler):
+    """Handler that holds up the listener thread until it is released."""
+
+    def __init__(self):
+        super().__init__()
+        self.busy = threading.Event()
+        self.done = threading.Event()
+
+    def emit(self, record):
+        self.busy.set()
+        self.done.wait(5)
+
+
+def test_dropped_records():
+    """
+    GIVEN a logger behind a full queue whose listener is busy
+    WHEN another record is logged
+    THEN it should be counted in the dropped records
+    """
+    logger = logging.getLogger("smoothblog.tests.queue_dropped")
+    logger.propagate = False
+    handler = BlockingHandler()
+    logger.addHandler(handler)
+
+    queue_handlers(logger, size=1)
+    logger.warning("taken by the listener")
+    handler.busy.wait(5)
+    logger.warning("queued")
+    logger.warning("dropped")
+
+    assert dropped_records() == 1
+    handler.done.set()
+    stop_listeners()
+    logger.handlers.clear()
+    assert dropped_records() == 0
+
+
+def test_warnings_reach_wsgi_errors(app, monkeypatch, tmp_path):
+    """
+    GIVEN the app's logging set up behind queues
+    WHEN a warning is logged during a request
+    THEN it should be written to the request's wsgi.errors stream
+    """
+    monkeypatch.setenv("LOG_FILE", str(tmp_path / "app.log"))
+    monkeypatch.setenv("SLOW_QUERY_LOG_FILE", str(tmp_path / "slow_queries.log"))
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    _init_logging(app)
+
+    stream = io.StringIO()
+    try:
+        with app.test_request_context(errors_stream=stream):
+            app.logger.warning("careful")
+    finally:
+        stop_listeners()
+        root.handlers[:] = handlers
+
+    assert "careful" in stream.getvalue()
+    assert "careful" in (tmp_path / "app.log").read_text()
@@ -0,0 +1,230 @@
+"""Test the schema migrations."""
+
+import pytest
+from smoothblog import migrations, search
+from smoothblog.database import db
+from smoothblog.models import Blog, User
+
+
+def _indexes(table):
+    rows = db.session.execute(db.text(f"PRAGMA index_list({table})")).all()
+    return {row.name for row in rows}
+
+
+def test_init_db_stamps_head(app):
+    """
+    GIVEN a freshly initialized database
+    WHEN its schema version is read
+    THEN it should be at the latest migration
+    """
+    with app.app_context(), db.engine.connect() as connection:
+        assert migrations.current_version(connection) == migrations.head()
+
+
+def test_upgrade_adds_indexes_and_keeps_data(app):
+    """
+    GIVEN a database from before the listing indexes existed
+    WHEN it is upgraded
+    THEN it should have the indexes and still hold every blog
+    """
+    with app.app_context():
+        db.session.execute(db.text("DROP INDEX ix_blog_date_id"))
+        db.session.execute(db.text("DROP INDEX ix_blog_user_id_date_id"))
+        db.session.commit()
+        migrations.stamp(0)
+
+        assert migrations.upgrade()[0] == "add_listing_indexes"
+        assert {"ix_blog_date_id", "ix_blog_user_id_date_id"} <= _indexes("blog")
+        assert Blog.query.count() == 2
+        assert migrations.upgrade() == []
+
+
+def test_upgrade_rolls_back_failed_migration(app, monkeypatch):
+    """
+    GIVEN a pending migration that fails part way through
+    WHEN the database is upgraded
+    THEN none of its changes nor its version should be kept
+    """
+
+    def broken(connection):
+        connection.exec_driver_sql("CREATE TABLE partial (id INTEGER)")
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [*migrations.MIGRATIONS, broken])
+
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            migrations.upgrade()
+
+        with db.engine.connect() as connection:
+            assert migrations.current_version(connection) == migrations.head() - 1
+        assert "partial" not in db.inspect(db.engine).get_table_names()
+
+
+def test_upgrade_db_command(runner):
+    """
+    GIVEN a command line
+    WHEN the upgrade-db command is run
+    THEN it should report the schema version
+    """
+    result = runner.invoke(args=["upgrade-db"])
+    assert f"schema version {migrations.head()}" in result.output
+
+
+def test_upgrade_cascades_blog_deletes(app):
+    """
+    GIVEN a database whose blogs do not cascade, with an orphaned blog
+    WHEN it is upgraded and a user is deleted
+    THEN the orphan should be gone, the user's blogs deleted with them and search
+    should still work
+    """
+    with app.app_context():
+        db.session.execute(db.text("PRAGMA foreign_keys = OFF"))
+        db.session.execute(
+            db.text("INSERT INTO blog (title, content, user_id) VALUES ('x', 'x', 99)")
+        )
+        db.session.commit()
+        db.session.execute(db.text("PRAGMA foreign_keys = ON"))
+        migrations.stamp(migrations.MIGRATIONS.index(migrations.cascade_blog_deletes))
+
+        assert migrations.upgrade()[0] == "cascade_blog_deletes"
+
+        (foreign_key,) = db.inspect(db.engine).get_foreign_keys("blog")
+        assert foreign_key["options"]["ondelete"] == "CASCADE"
+        assert {"ix_blog_date_id", "ix_blog_user_id_date_id"} <= _indexes("blog")
+        assert Blog.query.count() == 2
+
+        db.session.execute(db.text("DELETE FROM user WHERE username = 'test'"))
+        db.session.commit()
+        assert [blog.title for blog in Blog.query] == ["other title"]
+
+        other = User.query.filter_by(username="other").one()
+        db.session.add(Blog("searchable", "content", other.id))
+        db.session.commit()
+        assert search.search("searchable", 1, 10)[0]
+
+
+def test_upgrade_adds_excerpts_and_backfill(app, client, runner):
+    """
+    GIVEN a database from before blogs had excerpts
+    WHEN it is upgraded and the backfill-excerpts command is run
+    THEN every blog should get its excerpt, word count and reading time, and the
+    listings and feeds should change along with them
+    """
+    with app.app_context():
+        for column in ("excerpt", "word_count", "reading_time"):
+            db.session.execute(db.text(f"ALTER TABLE blog DROP COLUMN {column}"))
+        db.session.commit()
+        migrations.stamp(migrations.MIGRATIONS.index(migrations.add_blog_excerpts))
+
+        assert migrations.upgrade()[0] == "add_blog_excerpts"
+        assert Blog.query.filter(Blog.excerpt.is_(None)).count() == 2
+    etag = client.get("/home").headers["ETag"]
+    assert "test content" not in client.get("/feed.atom").text
+
+    result = runner.invoke(args=["backfill-excerpts", "--batch-size", "1"])
+    assert "Backfilled 2 excerpts" in result.output
+    assert client.get("/home").headers["ETag"] != etag
+    assert "test content" in client.get("/feed.atom").text
+
+    with app.app_context():
+        blog = Blog.query.filter_by(title="test title").one()
+        assert (blog.excerpt, blog.word_count, blog.reading_time) == (
+            "test content",
+            2,
+            1,
+        )
+
+
+def test_upgrade_adds_post_counters(app):
+    """
+    GIVEN a database from before users had post counters
+    WHEN it is upgraded
+    THEN every user's counters should match their blogs
+    """
+    with app.app_context():
+        for column in ("post_count", "last_posted_at"):
+            db.session.execute(db.text(f"ALTER TABLE user DROP COLUMN {column}"))
+        db.session.commit()
+        migrations.stamp(migrations.MIGRATIONS.index(migrations.add_user_post_counters))
+
+        assert migrations.upgrade() == [
+            "add_user_post_counters",
+            "add_user_pending_deletion",
+            "add_content_version",
+            "add_record_version",
+        ]
+        user = User.query.filter_by(username="test").one()
+        assert user.post_count == 1
+        assert user.last_posted_at == Blog.query.filter_by(user_id=user.id).one().date
+        assert User.query.filter_by(username="admin").one().post_count == 0
+
+
+def test_upgrade_adds_pending_deletion(app):
+    """
+    GIVEN a database from before deletions were flagged on the user
+    WHEN it is upgraded
+    THEN no user should be pending deletion
+    """
+    with app.app_context():
+        db.session.execute(db.text("ALTER TABLE user DROP COLUMN pending_deletion"))
+        db.session.commit()
+        migrations.stamp(
+            migrations.MIGRATIONS.index(migrations.add_user_pending_deletion)
+        )
+
+        assert migrations.upgrade() == [
+            "add_user_pending_deletion",
+            "add_content_version",
+            "add_record_version",
+        ]
+        assert not User.query.filter_by(pending_deletion=True).count()
+
+
+def test_upgrade_adds_content_version(app):
+    """
+    GIVEN a database from before the content was versioned
+    WHEN it is upgraded and a blog is deleted
+    THEN the content version should be bumped
+    """
+    with app.app_context():
+        db.session.execute(db.text("DROP TABLE content_version"))
+        db.session.commit()
+        migrations.stamp(migrations.MIGRATIONS.index(migrations.add_content_version))
+
+        assert migrations.upgrade() == ["add_content_version", "add_record_version"]
+        version = db.text("SELECT version FROM content_version")
+        before = db.session.execute(version).scalar()
+        db.session.execute(db.delete(Blog).where(Blog.title == "test title"))
+        db.session.commit()
+        assert db.session.execute(version).scalar() == before + 1
+
+
+def test_upgrade_adds_record_version(app):
+    """
+    GIVEN a database with a content version but no record version
+    WHEN it is upgraded and a blog is created and another deleted
+    THEN only the deletion should bump the record version
+    """
+    with app.app_context():
+        db.session.execute(db.text("DROP TABLE content_version"))
+        db.session.execute(
+            db.text(
+                "CREATE TABLE content_version (id INTEGER PRIMARY KEY, "
+                "version INTEGER NOT NULL, changed_at DATETIME NOT NULL)"
+            )
+        )
+        db.session.execute(
+            db.text("INSERT INTO content_version VALUES (1, 7, CURRENT_TIMESTAMP)")
+        )
+        db.session.commit()
+        migrations.stamp(migrations.MIGRATIONS.index(migrations.add_record_version))
+
+        assert migrations.upgrade() == ["add_record_version"]
+        current = db.text("SELECT version, record_version FROM content_version")
+        db.session.add(Blog(title="new", content="new content", user_id=1))
+        db.session.commit()
+        assert tuple(db.session.execute(current).one()) == (8, 0)
+        db.session.execute(db.delete(Blog).where(Blog.title == "test title"))
+        db.session.commit()
+        assert tuple(db.session.execute(current).one()) == (9, 1)
@@ -1,6 +1,6 @@
 """Test the database models."""
 
-from smoothblog.models import Blog, User
+from smoothblog.models import EXCERPT_WORDS, Blog, User, summarize
 
 
 def test_user_model():
@@ -35,3 +35,19 @@ def test_blog_model():
     assert blog.content == content
     assert blog.user_id == user_id
     assert repr(blog) == f"<Blog {title}>"
+
+
+def test_blog_model_summary():
+    """
+    GIVEN a long blog
+    WHEN a Blog model is created
+    THEN its excerpt, word count and reading time should be computed
+    """
+    content = "word " * 450
+    blog = Blog("title", content, 1)
+
+    assert blog.excerpt == " ".join(["word"] * EXCERPT_WORDS) + " …"
+    assert blog.word_count == 450
+    assert blog.reading_time == 3
+
+    assert summarize("Just a few words.") == ("Just a few words.", 4, 1)
@@ -1,7 +1,10 @@
 """Test other random functions."""
 
+import pytest
 from dotenv import load_dotenv
+from flask import request
 from smoothblog import create_app
+from smoothblog.database import db
 
 
 def test_config():
@@ -34,3 +37,58 @@ def test_init_db_command(runner, monkeypatch):
     result = runner.invoke(args=["init-db"])
     assert "Initialized the database" in result.output
     assert Recorder.called
+
+
+def test_sqlite_pragmas(app):
+    """
+    GIVEN the test app
+    WHEN a database connection is opened
+    THEN the configured SQLite pragmas should be applied
+    """
+    with app.app_context():
+        assert db.session.execute(db.text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(db.text("PRAGMA foreign_keys")).scalar() == 1
+        assert db.session.execute(db.text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_sqlite_pragmas_disabled(tmp_path):
+    """
+    GIVEN an app configured without SQLite pragmas
+    WHEN a database connection is opened
+    THEN SQLite's defaults should be left alone
+    """
+    app = create_app(
+        {
+            "SECRET_KEY": "testing",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'plain.sqlite'}",
+            "SQLITE_PRAGMAS": {},
+        }
+    )
+
+    with app.app_context():
+        assert db.session.execute(db.text("PRAGMA journal_mode")).scalar() == "delete"
+        db.engine.dispose()
+
+
+@pytest.mark.parametrize(
+    ("trusted_proxies", "remote_addr"), [(0, "127.0.0.1"), (1, "203.0.113.7")]
+)
+def test_trusted_proxies(tmp_path, trusted_proxies, remote_addr):
+    """
+    GIVEN an app behind a number of trusted proxies
+    WHEN a request comes with an X-Forwarded-For header
+    THEN the header should only set the client IP if a proxy is trusted
+    """
+    app = create_app(
+        {
+            "SECRET_KEY": "testing",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'proxied.sqlite'}",
+            "TRUSTED_PROXIES": trusted_proxies,
+        }
+    )
+    app.add_url_rule("/ip", "ip", lambda: request.remote_addr)
+
+    response = app.test_client().get("/ip", headers={"X-Forwarded-For": "203.0.113.7"})
+    assert response.text == remote_addr
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,141 @@
+"""Test the password hashing policy and hashing pool."""
+
+import pytest
+from smoothblog.database import db
+from smoothblog.models import User
+from smoothblog.passwords import (
+    HashingBusy,
+    HashingPool,
+    hash_password,
+    needs_rehash,
+    verify_password,
+)
+
+
+def test_hash_password_uses_configured_method(app):
+    """
+    GIVEN an app configured with a pbkdf2 hashing method
+    WHEN a password is hashed
+    THEN the hash should use that method and verify the password
+    """
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    with app.app_context():
+        pwhash = hash_password("secret")
+
+        assert pwhash.startswith("pbkdf2:sha256:1000$")
+        assert verify_password(pwhash, "secret")
+        assert not verify_password(pwhash, "wrong")
+        assert not needs_rehash(pwhash)
+
+
+def test_needs_rehash_when_method_changes(app):
+    """
+    GIVEN a hash made with the default method
+    WHEN the configured method or its cost changes
+    THEN the hash should need rehashing
+    """
+    with app.app_context():
+        pwhash = hash_password("secret")
+        assert not needs_rehash(pwhash)
+
+        app.config["PASSWORD_HASH_METHOD"] = "scrypt:16384:8:1"
+        assert needs_rehash(pwhash)
+
+        app.config["PASSWORD_HASH_METHOD"] = "pbkdf2"
+        assert needs_rehash(pwhash)
+        assert not needs_rehash(hash_password("secret"))
+
+
+def test_login_rehashes_outdated_password(app, auth):
+    """
+    GIVEN a user whose password was hashed with an older method
+    WHEN they log in
+    THEN their stored hash should be upgraded to the configured method
+    """
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+
+    assert auth.login().status_code == 302
+
+    with app.app_context():
+        user = User.query.filter_by(email="test@email.com").first()
+        assert user.password.startswith("pbkdf2:sha256:1000$")
+
+    auth.logout()
+    assert auth.login().status_code == 302
+
+
+def test_login_skips_rehash_when_busy(app, auth, monkeypatch):
+    """
+    GIVEN a user whose password was hashed with an older method
+    WHEN they log in while hashing is busy after their password was verified
+    THEN they should be logged in and keep their old hash
+    """
+    with app.app_context():
+        before = User.query.filter_by(email="test@email.com").first().password
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+
+    def busy(password):
+        raise HashingBusy()
+
+    monkeypatch.setattr("smoothblog.auth.hash_password", busy)
+    assert auth.login().status_code == 302
+
+    with app.app_context():
+        assert User.query.filter_by(email="test@email.com").first().password == before
+
+
+def test_login_wrong_password_keeps_hash(app, auth):
+    """
+    GIVEN a user whose password was hashed with an older method
+    WHEN they fail to log in
+    THEN their stored hash should be left alone
+    """
+    with app.app_context():
+        before = User.query.filter_by(email="test@email.com").first().password
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+
+    auth.login(password="wrong")
+
+    with app.app_context():
+        assert User.query.filter_by(email="test@email.com").first().password == before
+
+
+def test_hashing_pool(app, auth):
+    """
+    GIVEN an app hashing passwords in a process pool
+    WHEN a user registers and logs in
+    THEN the hashes should be computed by the pool
+    """
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    pool = HashingPool(1, 1, 5)
+    app.extensions["password_pool"] = pool
+    try:
+        with app.app_context():
+            db.session.add(User("pool@email.com", "pool", "pool"))
+            db.session.commit()
+
+        assert auth.login("pool@email.com", "pool").status_code == 302
+    finally:
+        pool.executor.shutdown()
+
+
+def test_hashing_pool_busy(app, auth):
+    """
+    GIVEN a hashing pool whose every slot is taken
+    WHEN a user logs in
+    THEN the login should fail with 503 instead of waiting forever
+    """
+    pool = HashingPool(1, 1, 0)
+    app.extensions["password_pool"] = pool
+    pool.slots.acquire()
+    try:
+        with pytest.raises(HashingBusy):
+            pool.run(pow, 2, 2)
+
+        response = auth.login()
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert b"busy" in response.data
+    finally:
+        pool.slots.release()
+        pool.executor.shutdown()
@@ -0,0 +1,168 @@
+"""Test the full text search."""
+
+from smoothblog import migrations
+from smoothblog.database import db
+from smoothblog.models import Blog, User
+from smoothblog.search import init_search, match_query, search
+
+
+def test_match_query_quotes_words():
+    """
+    GIVEN free text containing FTS5 operators
+    WHEN it is turned into a match query
+    THEN every word should be quoted
+    """
+    assert match_query('title AND "content*') == '"title" "AND" "content"'
+    assert match_query(" -- ") == ""
+
+
+def test_search_page(client):
+    """
+    GIVEN a test client
+    WHEN a request to "/search" is made without terms
+    THEN it should display the search form
+    """
+    response = client.get("/search")
+    assert response.status_code == 200
+    assert "No blogs matched" not in response.text
+
+
+def test_search_ranks_and_highlights(client):
+    """
+    GIVEN blogs with matching titles and content
+    WHEN a search is made
+    THEN it should list only the matches with the terms highlighted
+    """
+    response = client.get("/search?q=other")
+    assert "<mark>other</mark> title" in response.text
+    assert "<mark>other</mark> content" in response.text
+    assert "test title" not in response.text
+
+
+def test_search_escapes_content(app, client):
+    """
+    GIVEN a blog containing markup
+    WHEN it is found by a search
+    THEN its markup should be escaped
+    """
+    with app.app_context():
+        db.session.add(Blog("markup", "<script>alert(1)</script>", 2))
+        db.session.commit()
+
+    response = client.get("/search?q=alert")
+    assert "<script>" not in response.text
+    assert "&lt;script&gt;<mark>alert</mark>" in response.text
+
+
+def test_search_ignores_mark_characters(app, client):
+    """
+    GIVEN a blog containing the control characters matches are marked with
+    WHEN it is found by a search
+    THEN only the match should be highlighted
+    """
+    with app.app_context():
+        db.session.add(Blog("marks", "\x02unbalanced needle", 2))
+        db.session.commit()
+
+    response = client.get("/search?q=needle")
+    assert "unbalanced <mark>needle</mark>" in response.text
+    assert response.text.count("<mark>") == 1
+
+
+def test_search_no_results(client):
+    """
+    GIVEN a test client
+    WHEN a search matches nothing
+    THEN it should say so
+    """
+    response = client.get("/search?q=nothing")
+    assert "No blogs matched your search" in response.text
+
+
+def test_search_paginates(app, client):
+    """
+    GIVEN more matches than fit on one page
+    WHEN the next page is requested
+    THEN it should show the remaining matches
+    """
+    app.config["BLOG_PAGE_SIZE"] = 1
+
+    first = client.get("/search?q=title")
+    assert "page=2" in first.text
+
+    second = client.get("/search?q=title&page=2")
+    assert "page=1" in second.text
+    assert "page=3" not in second.text
+
+    assert client.get("/search?q=title&page=99999999999999999999").status_code == 400
+
+
+def test_index_follows_deletes(client, auth):
+    """
+    GIVEN a blog that can be found
+    WHEN it is deleted
+    THEN it should no longer be found
+    """
+    auth.login()
+    client.get("/delete/1")
+    assert "No blogs matched" in client.get("/search?q=test").text
+
+
+def test_rebuild_search_index_command(app, runner):
+    """
+    GIVEN an empty search index
+    WHEN the rebuild-search-index command is run
+    THEN every blog should be searchable again
+    """
+    with app.app_context():
+        db.session.execute(db.text("DELETE FROM blog_fts"))
+        db.session.commit()
+
+    result = runner.invoke(args=["rebuild-search-index"])
+    assert "Rebuilt the search index" in result.output
+
+    with app.app_context():
+        count = db.session.execute(
+            db.text("SELECT count(*) FROM blog_fts WHERE blog_fts MATCH 'title'")
+        ).scalar()
+    assert count == 2
+
+
+def test_upgrade_creates_search_index(app):
+    """
+    GIVEN a database from before the search index existed
+    WHEN it is upgraded
+    THEN its existing blogs should be searchable
+    """
+    with app.app_context():
+        db.session.execute(db.text("DROP TABLE blog_fts"))
+        db.session.commit()
+        migrations.stamp(migrations.MIGRATIONS.index(migrations.add_search_index))
+
+        assert migrations.upgrade()[0] == "add_search_index"
+        count = db.session.execute(
+            db.text("SELECT count(*) FROM blog_fts WHERE blog_fts MATCH 'content'")
+        ).scalar()
+    assert count == 2
+
+
+def test_init_search_repairs_interrupted_bulk_load(app):
+    """
+    GIVEN a bulk load that died after dropping the insert trigger
+    WHEN the app starts again
+    THEN the trigger should be back and every blog searchable
+    """
+    with app.app_context():
+        user_id = User.query.filter_by(username="test").one().id
+        db.session.execute(db.text("DROP TRIGGER blog_fts_insert"))
+        db.session.add(Blog("orphaned", "loaded while the trigger was gone", user_id))
+        db.session.commit()
+
+    init_search(app)
+
+    with app.app_context():
+        db.session.add(Blog("fresh", "written after the restart", user_id))
+        db.session.commit()
+        for word in ("orphaned", "fresh"):
+            hits, _ = search(word, 1, 10)
+            assert len(hits) == 1
@@ -0,0 +1,72 @@
+"""Test the synthetic data generator."""
+
+import random
+
+import pytest
+from smoothblog.database import db
+from smoothblog.models import Blog, User
+from smoothblog.seed import seed
+
+
+def test_seed(app, auth):
+    """
+    GIVEN an initialized database
+    WHEN it is seeded
+    THEN it should hold the new users and blogs, and the users should be able to log in
+    """
+    with app.app_context():
+        seed(10, 50, batch_size=7, rng=random.Random(1))
+
+        assert User.query.count() == 13
+        assert Blog.query.count() == 52
+        users = User.query.filter(User.username.like("user%")).all()
+        assert len({user.password for user in users}) == 1
+        assert all(blog.content for blog in Blog.query)
+        assert all(blog.excerpt and blog.word_count for blog in Blog.query)
+        indexed = db.session.execute(db.text("SELECT count(*) FROM blog_fts_docsize"))
+        assert indexed.scalar() == 52
+
+    response = auth.login("user4@example.com", "password", follow_redirects=True)
+    assert "Welcome back, user4!" in response.text
+
+
+def test_seed_blogs_only(app):
+    """
+    GIVEN an initialized database
+    WHEN only blogs are seeded
+    THEN they should be written by the existing users
+    """
+    with app.app_context():
+        seed(0, 20, password_hash="unused")
+        assert Blog.query.count() == 22
+        assert User.query.count() == 3
+
+
+def test_seed_blogs_without_users(app):
+    """
+    GIVEN a database without users
+    WHEN blogs are seeded
+    THEN it should refuse
+    """
+    with app.app_context():
+        Blog.query.delete()
+        User.query.delete()
+        db.session.commit()
+
+        with pytest.raises(ValueError):
+            seed(0, 1)
+
+
+def test_seed_command(app, runner):
+    """
+    GIVEN a command line
+    WHEN the seed command is run
+    THEN it should create the requested rows
+    """
+    result = runner.invoke(
+        args=["seed", "--users", "3", "--blogs", "5", "--random-seed", "1"]
+    )
+    assert "Seeded 3 users and 5 blogs" in result.output
+
+    with app.app_context():
+        assert Blog.query.count() == 7
@@ -0,0 +1,148 @@
+"""Test streamed listing pages."""
+
+import re
+
+import pytest
+from smoothblog.database import db
+from smoothblog.models import Blog, User
+from smoothblog.pagination import StreamedPage
+
+
+@pytest.fixture
+def streaming(app):
+    """Turn on streamed listings, fetching two rows at a time."""
+    app.config["STREAM_LISTINGS"] = True
+    app.config["STREAM_LISTINGS_BATCH_SIZE"] = 2
+    with app.app_context():
+        user_id = User.query.filter_by(username="test").one().id
+        db.session.add_all(Blog(f"blog {i}", "content", user_id) for i in range(5))
+        db.session.commit()
+    return app
+
+
+def _titles(response):
+    return re.findall(r'class="link-dark text-decoration-none">([^<]+)<', response.text)
+
+
+def test_streamed_page():
+    """
+    GIVEN a page over more rows than fit on it
+    WHEN it is iterated over
+    THEN it should stop after the extra row, close its source and know its cursors
+    """
+    read = []
+
+    def rows():
+        for i in range(10):
+            read.append(i)
+            yield i
+
+    page = StreamedPage(rows(), 3)
+    assert not page.has_next
+    assert list(page.items) == [0, 1, 2]
+    assert read == [0, 1, 2, 3]
+    assert page.has_next
+    assert page.next_cursor is None
+
+
+@pytest.mark.usefixtures("streaming")
+def test_home_streamed(app, client):
+    """
+    GIVEN streamed listings and more blogs than fit on a page
+    WHEN the pages of "/home" are requested
+    THEN they should be streamed and list the same blogs as buffered pages
+    """
+    app.config["BLOG_PAGE_SIZE"] = 3
+
+    first = client.get("/home")
+    assert "Content-Length" not in first.headers
+    assert _titles(first) == ["blog 4", "blog 3", "blog 2"]
+
+    cursor = re.search(r"\?after=([\w-]+)", first.text).group(1)
+    second = client.get(f"/home?after={cursor}")
+    assert "Content-Length" not in second.headers
+    assert "?before=" in second.text
+
+    app.config["STREAM_LISTINGS"] = False
+    buffered = client.get(f"/home?after={cursor}")
+    assert "Content-Length" in buffered.headers
+    assert _titles(second) == _titles(buffered) == ["blog 1", "blog 0", "other title"]
+
+
+@pytest.mark.usefixtures("streaming")
+def test_author_streamed(app, client):
+    """
+    GIVEN streamed listings
+    WHEN an author page is requested
+    THEN it should be streamed with only their blogs and a link to the next page
+    """
+    app.config["BLOG_PAGE_SIZE"] = 4
+
+    response = client.get("/user/test")
+    assert "Content-Length" not in response.headers
+    assert _titles(response) == ["blog 4", "blog 3", "blog 2", "blog 1"]
+    assert "?after=" in response.text
+
+
+@pytest.mark.usefixtures("streaming")
+def test_admin_streamed(app, client, auth):
+    """
+    GIVEN streamed listings and more users than fit on a page
+    WHEN an admin requests "/auth/admin"
+    THEN it should be streamed with a link to the next page
+    """
+    app.config["ADMIN_PAGE_SIZE"] = 2
+    auth.login("admin@email.com", "admin")
+
+    response = client.get("/auth/admin")
+    assert "Content-Length" not in response.headers
+    assert "admin@email.com" in response.text
+    assert "page=2" in response.text
+
+    response = client.get("/auth/admin?page=2")
+    assert "page=3" not in response.text
+
+
+@pytest.mark.usefixtures("streaming")
+def test_streamed_flashes(client, auth):
+    """
+    GIVEN streamed listings
+    WHEN a flashed message is shown on a streamed page
+    THEN it should not be shown again on the next one
+    """
+    auth.login()
+    client.post("/create", data={"title": "title", "content": "content"})
+
+    assert "Blog successfully created!" in client.get("/home").text
+    assert "Blog successfully created!" not in client.get("/home").text
+
+
+def _home_totals(app):
+    metrics = app.extensions["metrics"].render()
+    return [
+        float(
+            re.search(rf'smoothblog_{name}\{{endpoint="blog.home"\}} (\S+)', metrics)[1]
+        )
+        for name in ("sql_statements_total", "template_seconds_total")
+    ]
+
+
+@pytest.mark.usefixtures("streaming")
+def test_streamed_metrics(app, client):
+    """
+    GIVEN streamed listings
+    WHEN "/home" is streamed to the end
+    THEN its queries and template time should be recorded once it is closed, as
+    they are for a buffered page
+    """
+    app.config["RESPONSE_CACHE_ENABLED"] = False
+    response = client.get("/home", buffered=False)
+    assert "Server-Timing" not in response.headers
+    assert "blog 4" in response.get_data(as_text=True)
+    response.close()
+    statements, template_seconds = _home_totals(app)
+    assert template_seconds > 0
+
+    app.config["STREAM_LISTINGS"] = False
+    client.get("/home")
+    assert _home_totals(app)[0] == 2 * statements
@@ -0,0 +1,101 @@
+"""Test throttling of login attempts."""
+
+from smoothblog.throttle import MemoryBuckets
+
+
+def test_memory_buckets(clock):
+    """
+    GIVEN a bucket allowing a burst of 2 and 6 tokens a minute
+    WHEN tokens are taken faster than they refill
+    THEN the third attempt should wait until a token has refilled
+    """
+    buckets = MemoryBuckets(clock=clock)
+
+    assert buckets.take([("a", 6, 2)]) == [0]
+    assert buckets.take([("a", 6, 2)]) == [0]
+    assert buckets.take([("a", 6, 2)]) == [10]
+    assert buckets.take([("b", 6, 2)]) == [0]
+
+    clock.now = 10
+    assert buckets.take([("a", 6, 2)]) == [0]
+    assert buckets.take([("a", 6, 2)])[0] > 0
+
+
+def test_memory_buckets_evicts_oldest(clock):
+    """
+    GIVEN a bucket store limited to 2 buckets
+    WHEN a third key is used
+    THEN the least recently used bucket should be forgotten and start full again
+    """
+    buckets = MemoryBuckets(maxsize=2, clock=clock)
+
+    assert buckets.take([("a", 1, 1)]) == [0]
+    assert buckets.take([("b", 1, 1)]) == [0]
+    assert buckets.take([("c", 1, 1)]) == [0]
+    assert buckets.take([("a", 1, 1)]) == [0]
+    assert buckets.take([("c", 1, 1)])[0] > 0
+
+
+def test_memory_buckets_all_or_nothing(clock):
+    """
+    GIVEN two buckets, one of them empty
+    WHEN a token is taken from both
+    THEN neither should be spent
+    """
+    buckets = MemoryBuckets(clock=clock)
+    assert buckets.take([("b", 6, 1)]) == [0]
+
+    assert buckets.take([("a", 6, 1), ("b", 6, 1)]) == [0, 10]
+    assert buckets.take([("a", 6, 1)]) == [0]
+
+
+def test_login_throttled_by_email(app, auth, queries):
+    """
+    GIVEN a login throttle allowing a burst of 2 attempts per email
+    WHEN a third attempt is made for the same email
+    THEN it should get a 429 with Retry-After without looking up the user
+    """
+    app.extensions["login_throttle"].limits["email"] = (5, 2)
+
+    assert auth.login(password="wrong").status_code == 200
+    assert auth.login(email="TEST@email.com", password="wrong").status_code == 200
+
+    queries.statements.clear()
+    response = auth.login()
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) == 12
+    assert b"Too many login attempts" in response.data
+    assert not [s for s in queries.statements if "FROM user" in s]
+
+    assert auth.login(email="other@email.com", password="other").status_code == 302
+    assert app.extensions["login_throttle"].stats() == {
+        "allowed": 3,
+        "ip": 0,
+        "email": 1,
+    }
+
+
+def test_login_throttled_by_ip(app, auth):
+    """
+    GIVEN a login throttle allowing a burst of 1 attempt per IP
+    WHEN attempts for different emails come from the same IP
+    THEN the second attempt should get a 429
+    """
+    app.extensions["login_throttle"].limits["ip"] = (1, 1)
+
+    assert auth.login(password="wrong").status_code == 200
+    assert auth.login(email="other@email.com", password="other").status_code == 429
+    assert app.extensions["login_throttle"].stats()["ip"] == 1
+
+
+def test_login_throttle_disabled(app, auth):
+    """
+    GIVEN an app with login throttling disabled
+    WHEN more attempts than the burst are made
+    THEN none of them should be rejected
+    """
+    app.config["LOGIN_THROTTLE_ENABLED"] = False
+    app.extensions["login_throttle"].limits["email"] = (1, 1)
+
+    for _ in range(3):
+        assert auth.login(password="wrong").status_code == 200
@@ -0,0 +1,174 @@
+"""Test exporting and importing users and blogs."""
+
+import gzip
+import json
+
+import pytest
+from smoothblog import transfer
+from smoothblog.cli import init_db
+from smoothblog.database import db
+from smoothblog.models import Blog, User
+from smoothblog.search import search
+
+
+def _snapshot():
+    users = db.session.execute(
+        db.select(
+            User.id, User.email, User.username, User.password, User.post_count
+        ).order_by(User.id)
+    ).all()
+    blogs = db.session.execute(
+        db.select(Blog.id, Blog.title, Blog.content, Blog.date, Blog.excerpt).order_by(
+            Blog.id
+        )
+    ).all()
+    return users, blogs
+
+
+def test_export_import(app, runner, tmp_path):
+    """
+    GIVEN an exported database
+    WHEN it is imported into a freshly initialized one
+    THEN every user and blog should come back with their counters and search index
+    """
+    path = str(tmp_path / "export.ndjson.gz")
+    with app.app_context():
+        before = _snapshot()
+
+    result = runner.invoke(args=["export", path])
+    assert "Exported 3 users and 2 blogs" in result.output
+    with gzip.open(path, "rt") as file:
+        records = [json.loads(line) for line in file]
+    assert [record["type"] for record in records] == ["user"] * 3 + ["blog"] * 2
+    assert "excerpt" not in records[-1]
+
+    with app.app_context():
+        init_db()
+
+    result = runner.invoke(args=["import", path, "--batch-size", "2"])
+    assert "Imported 3 users and 2 blogs" in result.output, result.output
+
+    with app.app_context():
+        assert _snapshot() == before
+        hits, _ = search("other", 1, 10)
+        assert [hit.id for hit in hits] == [before[1][1].id]
+    assert not (tmp_path / "export.ndjson.gz.checkpoint").exists()
+
+
+def test_import_resumes(app, tmp_path, monkeypatch):
+    """
+    GIVEN an import that fails part way through
+    WHEN it is run again
+    THEN it should resume after the last committed batch and load everything
+    """
+    path = str(tmp_path / "export.ndjson")
+    with app.app_context():
+        transfer.export_rows(path)
+        before = _snapshot()
+        init_db()
+
+    upsert = transfer._upsert  # pylint: disable=protected-access
+    calls = []
+
+    def failing_upsert(kind, rows):
+        calls.append(kind)
+        if calls == ["user", "user", "user"]:
+            raise RuntimeError("connection lost")
+        upsert(kind, rows)
+
+    monkeypatch.setattr(transfer, "_upsert", failing_upsert)
+    with app.app_context(), pytest.raises(RuntimeError):
+        transfer.import_rows(path, batch_size=1)
+
+    with open(path + ".checkpoint", encoding="utf-8") as file:
+        assert json.load(file)["lines"] == 2
+
+    calls.clear()
+    with app.app_context():
+        assert transfer.import_rows(path, batch_size=1) == {"user": 1, "blog": 2}
+        assert _snapshot() == before
+    assert calls == ["user", "blog", "blog"]
+
+
+def test_import_invalid(app, runner, tmp_path):
+    """
+    GIVEN a file with an invalid line
+    WHEN it is imported
+    THEN the command should fail naming that line and keep the search triggers
+    """
+    path = tmp_path / "bad.ndjson"
+    path.write_text(
+        '{"type": "user", "id": 5, "email": "five@email.com", "username": "five", '
+        '"password": "hash"}\n\n{"type": "comment"}\n'
+    )
+
+    result = runner.invoke(args=["import", str(path)])
+    assert result.exit_code != 0
+    assert "Line 3 is not valid" in result.output
+    with app.app_context():
+        assert db.session.get(User, 5) is None
+        triggers = db.session.execute(
+            db.text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        ).scalars()
+        # pylint: disable-next=protected-access
+        assert set(transfer._TRIGGERS) <= set(triggers)
+
+
+def test_import_missing_field(app, runner, tmp_path):
+    """
+    GIVEN a file with a user without an email
+    WHEN it is imported
+    THEN the command should fail cleanly, naming the line and the missing field
+    """
+    path = tmp_path / "bad.ndjson"
+    path.write_text(
+        '{"type": "user", "id": 5, "username": "five", "password": "hash"}\n'
+    )
+
+    result = runner.invoke(args=["import", str(path)])
+    assert result.exit_code == 1
+    assert "Line 1 is not valid: user is missing email" in result.output
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+    with app.app_context():
+        assert db.session.get(User, 5) is None
+
+
+def test_import_constraint_violation(app, runner, tmp_path):
+    """
+    GIVEN a file with a user reusing the admin's email under another id
+    WHEN it is imported
+    THEN the command should fail cleanly, naming the lines and the constraint
+    """
+    with app.app_context():
+        admin = User.query.filter_by(username="admin").one()
+        email = admin.email
+    path = tmp_path / "clash.ndjson"
+    path.write_text(
+        json.dumps(
+            {
+                "type": "user",
+                "id": 50,
+                "email": "new@email.com",
+                "username": "new",
+                "password": "hash",
+            }
+        )
+        + "\n"
+        + json.dumps(
+            {
+                "type": "user",
+                "id": 51,
+                "email": email,
+                "username": "clash",
+                "password": "hash",
+            }
+        )
+        + "\n"
+    )
+
+    result = runner.invoke(args=["import", str(path)])
+    assert result.exit_code == 1
+    assert "Lines 1 to 2 could not be loaded" in result.output
+    assert "UNIQUE constraint failed: user.email" in result.output
+    with app.app_context():
+        assert db.session.get(User, 50) is None